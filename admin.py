@@ -1,9 +1,13 @@
 import os
 from dotenv import load_dotenv
-from db_connection import execute_query, fetch_all, fetch_one
+from db_connection import execute_query, fetch_all, fetch_one, on_commit, transaction
 from datetime import datetime
 from logger import log_admin_action
+from rollups import apply_transaction_delta, delete_couple_totals
+from categories import invalidate_categories
+from query_cache import invalidate_queries
 from env_validator import get_safe_env
+from authentication import hash_password
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,6 +24,8 @@ except ValueError as e:
 def is_admin(username, password_hash):
     """Check if user is admin"""
     import bcrypt
+    if not ADMIN_PASSWORD_HASH:
+        return False
     return username == ADMIN_USERNAME and bcrypt.checkpw(password_hash.encode('utf-8'), ADMIN_PASSWORD_HASH.encode('utf-8'))
 
 
@@ -53,24 +59,32 @@ def delete_user(admin_username, user_id):
         if str(user_id) == str(1) or admin_username == user_id: # Basic check to protect admin account
             return False, "❌ Cannot delete admin/primary user"
         
-        # Get couple_id associated with this user
-        query = """
-        SELECT id FROM couple_pairs 
-        WHERE user1_id = ? OR user2_id = ?
-        """
-        couple = fetch_one(query, (user_id, user_id))
-        
-        if couple:
-            couple_id = couple['id']
-            # Delete all transactions for this couple
-            execute_query("DELETE FROM transactions WHERE couple_id = ?", (couple_id,))
-            execute_query("DELETE FROM budgets WHERE couple_id = ?", (couple_id,))
-            execute_query("DELETE FROM categories WHERE couple_id = ?", (couple_id,))
-            execute_query("DELETE FROM recurring_transactions WHERE couple_id = ?", (couple_id,))
-            execute_query("DELETE FROM couple_pairs WHERE id = ?", (couple_id,))
-        
-        # Delete the user
-        execute_query("DELETE FROM users WHERE id = ?", (user_id,))
+        with transaction():
+            # Get couple_id associated with this user
+            query = """
+            SELECT id FROM couple_pairs 
+            WHERE user1_id = ? OR user2_id = ?
+            """
+            couple = fetch_one(query, (user_id, user_id))
+            
+            if couple:
+                couple_id = couple['id']
+                # Delete all transactions for this couple
+                execute_query("DELETE FROM transactions WHERE couple_id = ?", (couple_id,))
+                delete_couple_totals(couple_id)
+                execute_query("DELETE FROM budgets WHERE couple_id = ?", (couple_id,))
+                execute_query("DELETE FROM categories WHERE couple_id = ?", (couple_id,))
+                # After the commit, so a concurrent reader can't re-cache the deleted categories
+                on_commit(lambda: invalidate_categories(couple_id))
+                # Rendered reports hold the couple's data; a rolled-back delete keeps them
+                from report_store import purge_couple_reports
+                on_commit(lambda: purge_couple_reports(couple_id))
+                invalidate_queries(couple_id)
+                execute_query("DELETE FROM recurring_transactions WHERE couple_id = ?", (couple_id,))
+                execute_query("DELETE FROM couple_pairs WHERE id = ?", (couple_id,))
+            
+            # Delete the user
+            execute_query("DELETE FROM users WHERE id = ?", (user_id,))
         
         # LOG THE ACTION
         log_admin_action(admin_username, "DELETE_USER", user_id, "Deleted user and all associated data")
@@ -194,8 +208,16 @@ def delete_transaction(admin_username, transaction_id):
         if not has_permission:
             return False, msg
         
-        query = "DELETE FROM transactions WHERE id = ?"
-        execute_query(query, (transaction_id,))
+        with transaction():
+            query = "SELECT couple_id, category_id, amount, transaction_date, transaction_type FROM transactions WHERE id = ?"
+            trans = fetch_one(query, (transaction_id,))
+            
+            query = "DELETE FROM transactions WHERE id = ?"
+            execute_query(query, (transaction_id,))
+            
+            if trans:
+                apply_transaction_delta(trans['couple_id'], trans['transaction_date'], trans['category_id'], trans['transaction_type'], trans['amount'], sign=-1)
+                invalidate_queries(trans['couple_id'])
         
         # LOG THE ACTION
         log_admin_action(admin_username, "DELETE_TRANSACTION", transaction_id, "Deleted single transaction")
@@ -213,8 +235,7 @@ def reset_user_password(admin_username, user_id, new_password):
         if not has_permission:
             return False, msg
         
-        import bcrypt
-        password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        password_hash = hash_password(new_password)
         query = "UPDATE users SET password_hash = ? WHERE id = ?"
         execute_query(query, (password_hash, user_id))
         
@@ -1,15 +1,82 @@
 import bcrypt
+import threading
+import time
+from config import BCRYPT_MAX_ROUNDS, BCRYPT_MIN_ROUNDS, BCRYPT_ROUNDS, BCRYPT_TARGET_MS
 from db_connection import execute_query, fetch_one
 from security import validate_username, validate_email, validate_password, sanitize_input
 
+# bcrypt.gensalt()'s default cost; new hashes are never weaker than this
+DEFAULT_ROUNDS = 12
+# Calibration times this cheaper cost and extrapolates
+_CALIBRATION_ROUNDS = 10
+
+_rounds = None
+_rounds_lock = threading.Lock()
+
+def bcrypt_rounds():
+    """
+    bcrypt cost for new hashes (calibrated once per process)
+    Times a few cheap hashes and keeps the fastest (a busy moment at startup shouldn't
+    lower the cost); each extra round doubles the work, so the target cost is the highest
+    one whose estimate stays within BCRYPT_TARGET_MS. Calibration only raises the cost:
+    the result is never below BCRYPT_MIN_ROUNDS or bcrypt's default (DEFAULT_ROUNDS).
+    """
+    global _rounds
+    with _rounds_lock:
+        if _rounds is None:
+            floor = max(BCRYPT_MIN_ROUNDS, DEFAULT_ROUNDS)
+            if BCRYPT_ROUNDS:
+                _rounds = max(BCRYPT_ROUNDS, floor)
+            else:
+                samples = []
+                for _ in range(3):
+                    started = time.perf_counter()
+                    bcrypt.hashpw(b'calibration', bcrypt.gensalt(_CALIBRATION_ROUNDS))
+                    samples.append((time.perf_counter() - started) * 1000)
+                elapsed_ms = min(samples)
+                rounds = _CALIBRATION_ROUNDS
+                while rounds < BCRYPT_MAX_ROUNDS and elapsed_ms * 2 <= BCRYPT_TARGET_MS:
+                    rounds += 1
+                    elapsed_ms *= 2
+                _rounds = max(rounds, floor)
+        return _rounds
+
+def hash_rounds(password_hash):
+    """Cost stored in a bcrypt hash ('$2b$12$...' -> 12), None if unreadable"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def needs_rehash(password_hash):
+    """
+    True when a hash was made with a lower cost than the current target
+    Never downgrades: a slow startup measurement (or one that flips between two
+    costs across restarts) leaves stronger hashes alone.
+    """
+    rounds = hash_rounds(password_hash)
+    return rounds is not None and rounds < bcrypt_rounds()
+
 def hash_password(password):
-    """Hash a password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    """Hash a password using bcrypt at the calibrated cost"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(bcrypt_rounds())).decode('utf-8')
 
 def verify_password(password, password_hash):
     """Verify a password against its hash"""
     return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
 
+def rehash_password(user_id, password, password_hash):
+    """
+    Re-hash a just-verified password at the current cost
+    Only replaces the hash it was checked against, so a password changed meanwhile wins.
+    Returns True when the stored hash was updated.
+    """
+    if not needs_rehash(password_hash):
+        return False
+    query = "UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?"
+    cursor = execute_query(query, (hash_password(password), user_id, password_hash))
+    return cursor is not None and cursor.rowcount == 1
+
 def register_user(username, email, password, full_name):
     """Register a new user with validation"""
     try:
@@ -49,26 +116,11 @@ def register_user(username, email, password, full_name):
             return False, "❌ Username or email already exists"
         return False, f"❌ Registration failed"
 
-def login_user(username, password):
-    """Login a user and return user info"""
-    # Get user info AND password hash in ONE query (not two!)
-    query = "SELECT id, username, email, full_name, password_hash FROM users WHERE username = ?"
-    user = fetch_one(query, (username,))
-    
-    if not user:
-        return False, None, "Username not found"
-    
-    # Verify password
-    if verify_password(password, user['password_hash']):
-        # Return without the password hash (security)
-        return True, {
-            'id': user['id'],
-            'username': user['username'],
-            'email': user['email'],
-            'full_name': user['full_name']
-        }, "Login successful!"
-    else:
-        return False, None, "Incorrect password"
+def login_user(username, password, session_id=None):
+    """Login a user and return user info (kept for callers of the old API, see login_service.login)"""
+    from login_service import login
+    success, user, message, _ = login(username, password, session_id)
+    return success, user, message
 
 def get_user_by_id(user_id):
     """Get user information by ID"""
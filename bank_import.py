@@ -0,0 +1,243 @@
+"""
+Bank statement import (CSV and OFX/QFX)
+Statements are parsed as a stream, validated and written in batches through
+transactions.save_transactions_bulk (one commit per batch).
+OFX transactions are told apart by the bank's FITID. Identical lines of one
+statement (two coffees at the same place on the same day) are separate
+purchases: repeats are numbered, so they all import, while importing the same
+statement again still finds every line as a duplicate.
+"""
+import csv
+import io
+import re
+import time
+from datetime import datetime
+from transactions import save_transactions_bulk
+
+IMPORT_BATCH_SIZE = 500
+
+# Column names we recognise in bank CSV exports (lower-cased)
+_CSV_COLUMNS = {
+    'date': ('date', 'transaction date', 'transaction_date', 'posting date', 'value date'),
+    'description': ('description', 'details', 'narrative', 'memo', 'reference', 'name'),
+    'amount': ('amount', 'value', 'amount (r)'),
+    'debit': ('debit', 'debit amount', 'money out', 'withdrawal'),
+    'credit': ('credit', 'credit amount', 'money in', 'deposit'),
+    'category': ('category',),
+    'type': ('type', 'transaction type', 'transaction_type'),
+}
+
+_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%Y/%m/%d', '%d-%m-%Y', '%d %b %Y', '%d %B %Y', '%Y%m%d')
+
+_OFX_TRANSACTION = re.compile(r'<STMTTRN>(.*?)</STMTTRN>', re.IGNORECASE | re.DOTALL)
+_OFX_FIELD = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+
+def parse_date(value):
+    """Bank date string -> 'YYYY-MM-DD'"""
+    value = value.strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date '{value}'")
+
+
+def _ungroup(text, separator, value):
+    """'1,234,567' -> '1234567'; raises unless every group after the first has 3 digits"""
+    groups = text.split(separator)
+    if not 1 <= len(groups[0]) <= 3 or any(len(group) != 3 for group in groups[1:]):
+        raise ValueError(f"Ambiguous amount '{value}'")
+    return ''.join(groups)
+
+
+def parse_amount(value):
+    """
+    Bank amount string ('R1 234.50', '-99,00', '1.234,50', '(45.00)', '12.50-') -> float
+    With both separators the last one is the decimal point; a lone comma followed by
+    1-2 digits is a decimal comma. Anything else ambiguous ('1,2345') raises ValueError,
+    so the line is rejected instead of guessed.
+    """
+    text = value.strip().replace('R', '').replace(' ', '').replace('\xa0', '')
+    negative = False
+    if text.startswith('(') and text.endswith(')'):
+        negative, text = True, text[1:-1]
+    if text.endswith('-'):
+        # Trailing-minus debit
+        negative, text = True, text[:-1]
+    elif text.startswith(('-', '+')):
+        negative, text = text[0] == '-', text[1:]
+
+    if ',' in text and '.' in text:
+        point = max(text.rfind(','), text.rfind('.'))
+        whole = _ungroup(text[:point], '.' if text[point] == ',' else ',', value)
+        fraction = text[point + 1:]
+    elif ',' in text:
+        whole, _, fraction = text.rpartition(',')
+        if text.count(',') != 1 or len(fraction) not in (1, 2):
+            # Thousands separators only (1,234 / 1,234,567)
+            whole, fraction = _ungroup(text, ',', value), ''
+    elif text.count('.') > 1:
+        whole, fraction = _ungroup(text, '.', value), ''
+    else:
+        whole, _, fraction = text.partition('.')
+
+    if not (whole + fraction).isdigit():
+        raise ValueError(f"Unrecognised amount '{value}'")
+
+    amount = float(f"{whole or 0}.{fraction or 0}")
+    return -amount if negative else amount
+
+
+def _to_row(amount, description, trans_date, category, trans_type, source_id=None):
+    """Normalise a parsed line into a save_transactions_bulk row"""
+    if trans_type:
+        trans_type = 'Income' if trans_type.strip().lower() in ('income', 'credit', 'cr', 'deposit') else 'Expense'
+    else:
+        trans_type = 'Income' if amount > 0 else 'Expense'
+
+    amount = round(abs(amount), 2)
+    if amount <= 0:
+        raise ValueError("Amount must be greater than 0")
+
+    return (amount, category, (description or '').strip() or None, trans_date, trans_type, source_id)
+
+
+def _find_columns(fieldnames):
+    """Map our field names to the CSV's actual headers"""
+    headers = {name.strip().lower(): name for name in fieldnames if name}
+    columns = {}
+    for field, aliases in _CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in headers:
+                columns[field] = headers[alias]
+                break
+    return columns
+
+
+def iter_csv(stream, default_category):
+    """Yield (line_number, row, error) for every line of a CSV statement"""
+    reader = csv.DictReader(stream)
+    columns = _find_columns(reader.fieldnames or [])
+
+    if 'date' not in columns or not ({'amount', 'debit', 'credit'} & set(columns)):
+        yield reader.line_num, None, "CSV needs a date column and an amount (or debit/credit) column"
+        return
+
+    for line in reader:
+        try:
+            if 'amount' in columns and (line.get(columns['amount']) or '').strip():
+                amount = parse_amount(line[columns['amount']])
+            else:
+                debit = (line.get(columns.get('debit', ''), '') or '').strip()
+                credit = (line.get(columns.get('credit', ''), '') or '').strip()
+                amount = parse_amount(credit) if credit else -abs(parse_amount(debit))
+
+            category = (line.get(columns.get('category', ''), '') or '').strip() or default_category
+            row = _to_row(
+                amount,
+                line.get(columns.get('description', ''), ''),
+                parse_date(line[columns['date']]),
+                category,
+                line.get(columns.get('type', ''), '')
+            )
+            yield reader.line_num, row, None
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            yield reader.line_num, None, str(e)
+
+
+def iter_ofx(stream, default_category, read_size=64 * 1024):
+    """Yield (transaction_number, row, error) for every <STMTTRN> block of an OFX/QFX statement"""
+    buffer = ''
+    number = 0
+
+    while True:
+        chunk = stream.read(read_size)
+        buffer += chunk
+
+        last_end = 0
+        for match in _OFX_TRANSACTION.finditer(buffer):
+            last_end = match.end()
+            number += 1
+            fields = {tag.upper(): value.strip() for tag, value in _OFX_FIELD.findall(match.group(1))}
+            try:
+                description = fields.get('NAME') or fields.get('MEMO')
+                if fields.get('NAME') and fields.get('MEMO'):
+                    description = f"{fields['NAME']} {fields['MEMO']}"
+                row = _to_row(
+                    parse_amount(fields['TRNAMT']),
+                    description,
+                    parse_date(fields['DTPOSTED'][:8]),
+                    default_category,
+                    None,
+                    f"FITID {fields['FITID']}" if fields.get('FITID') else None
+                )
+                yield number, row, None
+            except (ValueError, KeyError) as e:
+                yield number, None, f"{e}"
+
+        # Keep the unfinished tail for the next read
+        buffer = buffer[last_end:]
+        if not chunk:
+            break
+
+
+def import_statement(file, couple_id, user_id, file_format=None, default_category="Uncategorised", batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import a bank statement (file object, bytes or str)
+    Returns a report dict: rows, imported, duplicates, rejected [(line, reason)], seconds, rows_per_sec
+    """
+    started = time.perf_counter()
+
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    if isinstance(file, str):
+        stream = io.StringIO(file)
+    elif isinstance(file, io.TextIOBase):
+        stream = file
+    else:
+        stream = io.TextIOWrapper(file, encoding='utf-8-sig', errors='replace', newline='')
+
+    if file_format is None:
+        name = getattr(file, 'name', '') or ''
+        file_format = 'ofx' if name.lower().endswith(('.ofx', '.qfx')) else 'csv'
+
+    lines = iter_ofx(stream, default_category) if file_format == 'ofx' else iter_csv(stream, default_category)
+
+    report = {'rows': 0, 'imported': 0, 'duplicates': 0, 'rejected': []}
+    batch = []
+    occurrences = {}
+
+    def flush():
+        try:
+            saved, duplicates = save_transactions_bulk(user_id, couple_id, [row for _, row in batch])
+            report['imported'] += saved
+            report['duplicates'] += duplicates
+        except Exception as e:
+            # The batch was rolled back as a whole
+            report['rejected'].extend((line_number, f"Batch not saved: {e}") for line_number, _ in batch)
+        batch.clear()
+
+    for line_number, row, error in lines:
+        report['rows'] += 1
+        if error:
+            report['rejected'].append((line_number, error))
+            continue
+
+        if row[5] is None:
+            # Number repeats of an identical line so they aren't taken for duplicates of each other
+            occurrences[row] = occurrences.get(row, 0) + 1
+            if occurrences[row] > 1:
+                row = row[:5] + (f"repeat {occurrences[row]}",)
+
+        batch.append((line_number, row))
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    report['seconds'] = time.perf_counter() - started
+    report['rows_per_sec'] = report['rows'] / report['seconds'] if report['seconds'] else 0.0
+    return report
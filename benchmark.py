@@ -0,0 +1,403 @@
+"""
+Performance benchmarks for the budget database
+Usage: python benchmark.py [name ...]   (runs every benchmark when no name is given)
+Each benchmark builds its own throwaway database, so it never touches budget.db
+"""
+import os
+import sys
+import atexit
+import calendar
+import shutil
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+# Point the app modules at a scratch database before config is imported
+_BENCH_DIR = tempfile.mkdtemp(prefix='budget-bench-')
+atexit.register(shutil.rmtree, _BENCH_DIR, True)
+os.environ['DATABASE_PATH'] = os.path.join(_BENCH_DIR, 'app.db')
+
+from init_db import create_tables
+from migrations import apply_migrations
+from db_connection import configure_connection, acquire_connection, release_connection
+from config import DATABASE_PATH, DB_PRAGMAS, DB_BUSY_TIMEOUT
+
+# SQLite out of the box: rollback journal, fsync on every commit
+STOCK_PRAGMAS = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'busy_timeout': DB_BUSY_TIMEOUT,
+}
+
+
+def _connect(path, pragmas):
+    conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT / 1000, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return configure_connection(conn, pragmas)
+
+
+def build_database(path, couples=50, transactions_per_couple=400, months=24, pragmas=None):
+    """Create a database filled with random transactions"""
+    conn = _connect(path, DB_PRAGMAS if pragmas is None else pragmas)
+    create_tables(conn)
+
+    categories = []
+    for couple_id in range(1, couples + 1):
+        for name in ('Housing', 'Food & Groceries', 'Transportation', 'Salary'):
+            category_type = 'income' if name == 'Salary' else 'expense'
+            cursor = conn.execute(
+                "INSERT INTO categories (couple_id, category_name, category_type) VALUES (?, ?, ?)",
+                (couple_id, name, category_type)
+            )
+            categories.append((couple_id, cursor.lastrowid, category_type))
+
+    start = date.today().replace(day=1) - timedelta(days=months * 30)
+    rows = []
+    for couple_id, category_id, category_type in categories:
+        for _ in range(transactions_per_couple // 4):
+            rows.append((
+                couple_id, couple_id, category_id,
+                round(random.uniform(10, 5000), 2),
+                f"txn {random.randint(1, 10**9)}",
+                (start + timedelta(days=random.randint(0, months * 30))).isoformat(),
+                'Income' if category_type == 'income' else 'Expense'
+            ))
+    conn.executemany(
+        "INSERT INTO transactions (couple_id, user_id, category_id, amount, description, transaction_date, transaction_type) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+    # Indexes and rollups are built from the seeded rows, like upgrading a live database
+    apply_migrations(conn, verbose=False)
+    return conn
+
+
+def _run_concurrency(path, pragmas, duration, readers, couples):
+    """One writer committing single inserts while several readers run dashboard queries"""
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'busy': 0}
+    lock = threading.Lock()
+    today = date.today()
+    month_start = today.replace(day=1).isoformat()
+
+    def writer():
+        conn = _connect(path, pragmas)
+        while not stop.is_set():
+            couple_id = random.randint(1, couples)
+            try:
+                conn.execute(
+                    "INSERT INTO transactions (couple_id, user_id, category_id, amount, description, transaction_date, transaction_type) VALUES (?, ?, ?, ?, ?, ?, 'Expense')",
+                    (couple_id, couple_id, couple_id * 4, 99.0, f"bench {time.time()}", today.isoformat())
+                )
+                conn.commit()
+                with lock:
+                    counts['writes'] += 1
+            except sqlite3.OperationalError:
+                conn.rollback()
+                with lock:
+                    counts['busy'] += 1
+        conn.close()
+
+    def reader():
+        conn = _connect(path, pragmas)
+        while not stop.is_set():
+            try:
+                conn.execute(
+                    "SELECT transaction_type, SUM(amount) FROM transactions WHERE couple_id = ? AND transaction_date >= ? GROUP BY transaction_type",
+                    (random.randint(1, couples), month_start)
+                ).fetchall()
+                with lock:
+                    counts['reads'] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counts['busy'] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    return {key: value / duration for key, value in counts.items()}
+
+
+def bench_concurrency(duration=3.0, readers=4, couples=50):
+    """Reader/writer throughput with the stock SQLite profile vs the configured one"""
+    print(f"Concurrency: 1 writer + {readers} readers, {duration:.0f}s per profile")
+    for label, pragmas in (('stock', STOCK_PRAGMAS), ('configured', DB_PRAGMAS)):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            build_database(path, couples=couples, pragmas=pragmas).close()
+            result = _run_concurrency(path, pragmas, duration, readers, couples)
+        print(f"  {label:<11} reads/s={result['reads']:>9.0f}  writes/s={result['writes']:>7.0f}  busy/s={result['busy']:>5.1f}")
+
+
+def _ensure_app_database(couples=50):
+    """Seed the scratch database the app modules point at (once per run)"""
+    if not os.path.exists(DATABASE_PATH):
+        build_database(DATABASE_PATH, couples=couples).close()
+
+
+def bench_import(lines=20000):
+    """Bank statement import throughput (CSV lines/sec, batched inserts)"""
+    from bank_import import import_statement
+
+    _ensure_app_database()
+    start = date.today() - timedelta(days=365)
+    csv_lines = ["Date,Description,Amount"]
+    for i in range(lines):
+        amount = round(random.uniform(-3000, 3000), 2) or 1.0
+        csv_lines.append(f"{(start + timedelta(days=i % 365)).isoformat()},Card purchase {i},{amount}")
+    statement = "\n".join(csv_lines)
+
+    report = import_statement(statement, couple_id=999, user_id=999)
+    print(f"Import: {report['rows']} lines in {report['seconds']:.2f}s = {report['rows_per_sec']:.0f} lines/s "
+          f"(imported {report['imported']}, duplicates {report['duplicates']}, rejected {len(report['rejected'])})")
+
+    report = import_statement(statement, couple_id=999, user_id=999)
+    print(f"Re-import (all duplicates): {report['rows_per_sec']:.0f} lines/s, duplicates {report['duplicates']}")
+
+
+def bench_import_parsing():
+    """parse_amount on the formats banks export; ambiguous amounts must be rejected, not guessed"""
+    from bank_import import parse_amount
+
+    cases = (
+        ('R1 234.50', 1234.5), ('1,234.50', 1234.5), ('1.234,50', 1234.5), ('-99,00', -99.0),
+        ('12,5', 12.5), ('(45.00)', -45.0), ('12-', -12.0), ('12.50-', -12.5), ('1,234', 1234.0),
+        ('1.234.567', 1234567.0), ('+7', 7.0),
+        ('1,2345', ValueError), ('12,34,5', ValueError), ('1.2.3', ValueError), ('abc', ValueError), ('', ValueError),
+    )
+    failures = 0
+    for text, expected in cases:
+        try:
+            result = parse_amount(text)
+        except ValueError:
+            result = ValueError
+        if result != expected:
+            failures += 1
+            print(f"  FAIL parse_amount({text!r}) = {result}, expected {expected}")
+    print(f"Import parsing: {len(cases) - failures}/{len(cases)} amount formats ok")
+    return failures == 0
+
+
+def bench_reports(rows=50000, couple_id=2000):
+    """Report build, Excel and PDF export time for one month with many transactions"""
+    from reports import build_report, export_to_excel, export_to_pdf
+
+    _ensure_app_database()
+    today = date.today()
+    month_start = today.replace(day=1)
+
+    conn = _connect(DATABASE_PATH, DB_PRAGMAS)
+    category_ids = []
+    for name, category_type in (('Housing', 'expense'), ('Food & Groceries', 'expense'), ('Transportation', 'expense'), ('Salary', 'income')):
+        cursor = conn.execute(
+            "INSERT INTO categories (couple_id, category_name, category_type) VALUES (?, ?, ?)",
+            (couple_id, name, category_type)
+        )
+        category_ids.append((cursor.lastrowid, category_type))
+        conn.execute(
+            "INSERT INTO budgets (couple_id, category_id, planned_amount, month_year) VALUES (?, ?, ?, ?)",
+            (couple_id, cursor.lastrowid, 50000.0, month_start.strftime('%Y-%m'))
+        )
+    seed = []
+    for i in range(rows):
+        category_id, category_type = category_ids[i % len(category_ids)]
+        seed.append((
+            couple_id, couple_id, category_id,
+            round(random.uniform(10, 5000), 2),
+            f"report txn {i}",
+            month_start.replace(day=random.randint(1, 28)).isoformat(),
+            'Income' if category_type == 'income' else 'Expense'
+        ))
+    conn.executemany(
+        "INSERT INTO transactions (couple_id, user_id, category_id, amount, description, transaction_date, transaction_type) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        seed
+    )
+    conn.commit()
+    conn.close()
+
+    started = time.perf_counter()
+    report = build_report(couple_id, month_start.month, month_start.year)
+    built = time.perf_counter() - started
+
+    started = time.perf_counter()
+    export_to_excel(couple_id, month_start.month, month_start.year)
+    exported = time.perf_counter() - started
+
+    print(f"Reports: {len(report['transactions'])} rows  build_report={built:.2f}s  export_to_excel={exported:.2f}s")
+
+    for label, summary_only in (('full', False), ('summary-only', True)):
+        timings = {}
+        export_to_pdf(couple_id, month_start.month, month_start.year, summary_only=summary_only, timings=timings)
+        sections = '  '.join(f"{name}={seconds:.2f}s" for name, seconds in timings.items())
+        print(f"  PDF {label:<12} total={sum(timings.values()):.2f}s  {sections}")
+
+
+def bench_query_plans(couples=50):
+    """EXPLAIN QUERY PLAN for the statements issued by the month queries, flags table scans and unranged date filters"""
+    from transactions import get_monthly_total, get_category_summary, get_budget_vs_actual, get_dashboard_snapshot
+    from reports import generate_monthly_report
+    from query_cache import clear_query_cache
+
+    _ensure_app_database(couples)
+    # A cached call issues no SQL, so there would be no plan to check
+    clear_query_cache()
+
+    # The pool hands the same (LIFO) connection back on this thread, so tracing it sees every statement
+    statements = []
+    conn = acquire_connection()
+    conn.set_trace_callback(statements.append)
+    release_connection(conn)
+
+    today = date.today()
+    checks = (
+        ('get_monthly_total', lambda: get_monthly_total(1, today.month, today.year)),
+        ('get_category_summary', lambda: get_category_summary(1, today.month, today.year)),
+        ('get_budget_vs_actual', lambda: get_budget_vs_actual(1, today.month, today.year)),
+        ('get_dashboard_snapshot', lambda: get_dashboard_snapshot(1, today.month, today.year)),
+        ('generate_monthly_report', lambda: generate_monthly_report(1, today.month, today.year)),
+    )
+
+    print("Query plans:")
+    failures = 0
+    for name, call in checks:
+        statements.clear()
+        call()
+        # Skip the pool's "SELECT 1" health check
+        selects = [sql for sql in statements if sql.lstrip().upper().startswith('SELECT') and sql.strip() != 'SELECT 1']
+        for sql in selects:
+            plan = [row['detail'] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+            scans = [detail for detail in plan if detail.startswith('SCAN')]
+            reads_transactions = 'transactions' in sql and 'transaction_date' in sql
+            uses_range = any('transaction_date>' in detail for detail in plan)
+            bad = bool(scans) or (reads_transactions and not uses_range)
+            failures += bad
+            print(f"  {'FAIL' if bad else 'ok':<4} {name}: {' | '.join(plan)}")
+
+    conn.set_trace_callback(None)
+    if failures:
+        print(f"  {failures} statement(s) scan a table or filter dates without the index")
+    return failures == 0
+
+
+def _reference_next_date(current_date, frequency):
+    """calculate_next_date as originally written (one if/elif branch per frequency), the oracle for the fast paths"""
+    current = datetime.strptime(current_date, '%Y-%m-%d')
+    if frequency == 'Weekly':
+        next_date = current + timedelta(days=7)
+    elif frequency == 'Bi-weekly':
+        next_date = current + timedelta(days=14)
+    elif frequency in ('Monthly', 'Quarterly'):
+        year, month = current.year, current.month + (1 if frequency == 'Monthly' else 3)
+        if month > 12:
+            year += 1
+            month -= 12
+        next_date = current.replace(year=year, month=month, day=min(current.day, calendar.monthrange(year, month)[1]))
+    elif frequency == 'Yearly':
+        try:
+            next_date = current.replace(year=current.year + 1)
+        except ValueError:
+            # Feb 29 -> Feb 28
+            next_date = current.replace(year=current.year + 1, day=28)
+    else:
+        next_date = current
+    return next_date.strftime('%Y-%m-%d')
+
+
+def bench_recurring_dates(cases=20000, seed=7):
+    """
+    calculate_next_date (memoized), advance_dates and expand_occurrences against the original algorithm
+    Every day of 2023-2029 (month ends, Feb 29) x every frequency, then random multi-step batches.
+    """
+    import numpy as np
+    from recurring import calculate_next_date
+    from projections import advance_dates, expand_occurrences
+
+    frequencies = ('Weekly', 'Bi-weekly', 'Monthly', 'Quarterly', 'Yearly', 'Unknown')
+    mismatches = []
+
+    days = [(date(2023, 1, 1) + timedelta(days=i)).isoformat() for i in range((date(2030, 1, 1) - date(2023, 1, 1)).days)]
+    started = time.perf_counter()
+    for day in days:
+        for frequency in frequencies:
+            expected = _reference_next_date(day, frequency)
+            if calculate_next_date(day, frequency) != expected:
+                mismatches.append(('calculate_next_date', day, frequency, expected))
+    scalar = time.perf_counter() - started
+
+    # advance_dates: N steps at once == N calls of the original
+    rng = random.Random(seed)
+    starts = [rng.choice(days) for _ in range(cases)]
+    chosen = [rng.choice(frequencies) for _ in range(cases)]
+    steps = [rng.randint(0, 30) for _ in range(cases)]
+    started = time.perf_counter()
+    advanced = advance_dates(np.array(starts, dtype='datetime64[D]'), np.array(chosen, dtype=object), np.array(steps))
+    batch = time.perf_counter() - started
+    for day, frequency, count, result in zip(starts, chosen, steps, advanced):
+        expected = day
+        for _ in range(count):
+            expected = _reference_next_date(expected, frequency)
+        if str(result) != expected:
+            mismatches.append(('advance_dates', day, frequency, count, expected, str(result)))
+
+    # expand_occurrences: every occurrence in a window == walking the original from next_date
+    window_start, window_end = date(2025, 1, 1), date(2027, 6, 30)
+    sample = rng.sample(range(cases), 2000)
+    item_index, occurrences = expand_occurrences(
+        np.array([starts[i] for i in sample], dtype='datetime64[D]'),
+        np.array([chosen[i] for i in sample], dtype=object),
+        window_start, window_end
+    )
+    found = sorted(zip(item_index.tolist(), map(str, occurrences)))
+    expected_occurrences = []
+    for position, i in enumerate(sample):
+        current = starts[i]
+        while current <= window_end.isoformat():
+            if current >= window_start.isoformat():
+                expected_occurrences.append((position, current))
+            following = _reference_next_date(current, chosen[i])
+            if following == current:
+                break
+            current = following
+    if found != sorted(expected_occurrences):
+        mismatches.append(('expand_occurrences', len(found), len(expected_occurrences)))
+
+    print(f"Recurring dates: {len(days) * len(frequencies)} single steps in {scalar:.2f}s, "
+          f"{cases} batch advances in {batch * 1000:.0f} ms, {len(found)} window occurrences")
+    for mismatch in mismatches[:10]:
+        print(f"  MISMATCH {mismatch}")
+    if mismatches:
+        print(f"  {len(mismatches)} mismatch(es) against the original algorithm")
+    return not mismatches
+
+
+BENCHMARKS = {
+    'concurrency': bench_concurrency,
+    'query_plans': bench_query_plans,
+    'import': bench_import,
+    'import_parsing': bench_import_parsing,
+    'reports': bench_reports,
+    'recurring_dates': bench_recurring_dates,
+}
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+
+    # Checks (like query_plans) return False on failure; fail the run so CI notices
+    failed = [name for name in names if BENCHMARKS[name]() is False]
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+        sys.exit(1)
@@ -0,0 +1,79 @@
+"""
+Per-couple category cache
+couple_id -> {category_name: (id, category_type)}, loaded with one query on
+first use. Save, edit, budget and bulk paths resolve names here instead of
+running a SELECT per call. A name missing from the cache is looked up in the
+database before it counts as unknown (another process, e.g. the scheduler, may
+have created it), and new or looked-up rows are only cached once they commit.
+"""
+import threading
+from db_connection import execute_query, fetch_all, fetch_one, on_commit
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def invalidate_categories(couple_id=None):
+    """Forget the cached categories of one couple (or of everyone)"""
+    with _lock:
+        if couple_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(couple_id, None)
+
+
+def get_categories(couple_id):
+    """All categories of a couple as {name: (id, type)} - treat as read-only"""
+    with _lock:
+        categories = _cache.get(couple_id)
+
+    if categories is None:
+        query = "SELECT id, category_name, category_type FROM categories WHERE couple_id = ?"
+        categories = {row['category_name']: (row['id'], row['category_type']) for row in fetch_all(query, (couple_id,))}
+        with _lock:
+            _cache[couple_id] = categories
+
+    return categories
+
+
+def _remember(couple_id, category_name, category_id, category_type):
+    # Copy-on-write so readers holding the old dict never see it change
+    with _lock:
+        if couple_id in _cache:
+            categories = dict(_cache[couple_id])
+            categories[category_name] = (category_id, category_type)
+            _cache[couple_id] = categories
+
+
+def get_category_id(couple_id, category_name, create_type=None):
+    """
+    Id of a couple's category by name
+    Creates the category when it's missing and create_type ('expense'/'income') is given,
+    otherwise returns None for unknown names.
+    """
+    cached = get_categories(couple_id).get(category_name)
+    if cached:
+        return cached[0]
+
+    # Not cached: it may have been created by another process since our cache was loaded
+    query = "SELECT id, category_type FROM categories WHERE couple_id = ? AND category_name = ?"
+    row = fetch_one(query, (couple_id, category_name))
+    if row:
+        category_id, category_type = row['id'], row['category_type']
+    elif create_type is None:
+        return None
+    else:
+        query = "INSERT OR IGNORE INTO categories (couple_id, category_name, category_type) VALUES (?, ?, ?)"
+        cursor = execute_query(query, (couple_id, category_name, create_type))
+
+        if cursor is not None and cursor.rowcount == 1:
+            category_id = cursor.lastrowid
+        else:
+            # Someone else created it since our lookup
+            query = "SELECT id FROM categories WHERE couple_id = ? AND category_name = ?"
+            category_id = fetch_one(query, (couple_id, category_name))['id']
+        category_type = create_type
+
+    # Inside transaction() the row may still be rolled back: cache it only once it commits
+    on_commit(lambda: _remember(couple_id, category_name, category_id, category_type))
+    return category_id
@@ -28,3 +28,60 @@ DEFAULT_CATEGORIES = {
     'Salary': 'income',
     'Bonus': 'income',
 }
+
+# Database connection pool (idle connections kept open between queries)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 8))
+
+# SQLite connection profile (applied to every new connection)
+# Set DB_JOURNAL_MODE=DELETE and DB_SYNCHRONOUS=FULL to get SQLite's stock behaviour back
+DB_JOURNAL_MODE = os.getenv('DB_JOURNAL_MODE', 'WAL')
+DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')
+DB_CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', -20000))  # negative = KiB, so ~20 MB
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', 134217728))  # 128 MB
+DB_TEMP_STORE = os.getenv('DB_TEMP_STORE', 'MEMORY')
+DB_BUSY_TIMEOUT = int(os.getenv('DB_BUSY_TIMEOUT', 5000))  # milliseconds
+
+DB_PRAGMAS = {
+    'journal_mode': DB_JOURNAL_MODE,
+    'synchronous': DB_SYNCHRONOUS,
+    'cache_size': DB_CACHE_SIZE,
+    'mmap_size': DB_MMAP_SIZE,
+    'temp_store': DB_TEMP_STORE,
+    'busy_timeout': DB_BUSY_TIMEOUT,
+}
+
+# Dashboard query cache (see query_cache.py); QUERY_CACHE_SIZE=0 turns it off
+QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', 1024))  # cached results kept (LRU)
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', 300))  # seconds
+
+# Rendered report files (see report_store.py), kept next to the database by default
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR', os.path.join(os.path.dirname(DATABASE_PATH) or '.', 'report_cache'))
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', 2))  # background report builder threads
+REPORT_CACHE_MAX_AGE_DAYS = float(os.getenv('REPORT_CACHE_MAX_AGE_DAYS', 30))  # unused files older than this are deleted
+REPORT_CACHE_MAX_MB = float(os.getenv('REPORT_CACHE_MAX_MB', 500))  # least recently used files go past this size
+
+# Recurring postings scheduler (see scheduler.py)
+SCHEDULER_BATCH_SIZE = int(os.getenv('SCHEDULER_BATCH_SIZE', 100))  # couples claimed per batch
+SCHEDULER_INTERVAL = int(os.getenv('SCHEDULER_INTERVAL', 3600))  # seconds between worker passes
+SCHEDULER_LEASE_SECONDS = int(os.getenv('SCHEDULER_LEASE_SECONDS', 300))  # claim expiry if a worker dies
+
+# Login password checks (see login_service.py); bcrypt releases the GIL, so threads hash in parallel
+LOGIN_WORKERS = int(os.getenv('LOGIN_WORKERS', min(4, os.cpu_count() or 1)))  # concurrent bcrypt checks
+LOGIN_QUEUE_LIMIT = int(os.getenv('LOGIN_QUEUE_LIMIT', 64))  # waiting checks before logins are turned away
+LOGIN_TIMEOUT = float(os.getenv('LOGIN_TIMEOUT', 10))  # seconds a login waits for its checks
+
+# bcrypt cost: BCRYPT_ROUNDS pins it, otherwise startup picks the highest cost whose
+# hash fits in BCRYPT_TARGET_MS on this machine (within the min/max bounds). Calibration
+# can only raise the cost: it never goes below bcrypt's default of 12.
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 0))  # 0 = calibrate
+BCRYPT_TARGET_MS = float(os.getenv('BCRYPT_TARGET_MS', 250))
+BCRYPT_MIN_ROUNDS = int(os.getenv('BCRYPT_MIN_ROUNDS', 12))
+BCRYPT_MAX_ROUNDS = int(os.getenv('BCRYPT_MAX_ROUNDS', 15))
+
+# Login throttle (see login_throttle.py): failed attempts allowed per username and per
+# browser session within a sliding window; LOGIN_THROTTLE_PERSIST keeps them across restarts
+LOGIN_THROTTLE_USER_ATTEMPTS = int(os.getenv('LOGIN_THROTTLE_USER_ATTEMPTS', 5))
+LOGIN_THROTTLE_SESSION_ATTEMPTS = int(os.getenv('LOGIN_THROTTLE_SESSION_ATTEMPTS', 20))
+LOGIN_THROTTLE_WINDOW = int(os.getenv('LOGIN_THROTTLE_WINDOW', 900))  # seconds
+LOGIN_THROTTLE_MAX_KEYS = int(os.getenv('LOGIN_THROTTLE_MAX_KEYS', 10000))  # tracked usernames + sessions (LRU)
+LOGIN_THROTTLE_PERSIST = os.getenv('LOGIN_THROTTLE_PERSIST', 'False').lower() == 'true'
@@ -1,4 +1,4 @@
-from db_connection import execute_query, fetch_all, fetch_one
+from db_connection import execute_query, fetch_all, fetch_one, transaction
 from datetime import datetime
 
 
@@ -87,29 +87,30 @@ def get_pending_invitations(user_id):
 def accept_invitation(invitation_id, user_id):
     """Accept a pairing invitation"""
     try:
-        # Get invitation details
-        query = "SELECT sender_id, receiver_id, couple_name FROM pairing_invitations WHERE id = ?"
-        invitation = fetch_one(query, (invitation_id,))
-        
-        if not invitation:
-            return False, "❌ Invitation not found"
-        
-        # Security: Check if user is the receiver
-        if invitation['receiver_id'] != user_id:
-            return False, "❌ You can only accept invitations sent to you"
-        
-        # Create couple pairing
-        query = """
-        INSERT INTO couple_pairs (user1_id, user2_id, couple_name, created_at)
-        VALUES (?, ?, ?, ?)
-        """
-        execute_query(query, (invitation['sender_id'], invitation['receiver_id'], invitation['couple_name'], datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
-        
-        # Update invitation status
-        query = "UPDATE pairing_invitations SET status = 'Accepted' WHERE id = ?"
-        execute_query(query, (invitation_id,))
-        
-        return True, "✅ Invitation accepted! You are now paired!"
+        with transaction():
+            # Get invitation details
+            query = "SELECT sender_id, receiver_id, couple_name FROM pairing_invitations WHERE id = ?"
+            invitation = fetch_one(query, (invitation_id,))
+            
+            if not invitation:
+                return False, "❌ Invitation not found"
+            
+            # Security: Check if user is the receiver
+            if invitation['receiver_id'] != user_id:
+                return False, "❌ You can only accept invitations sent to you"
+            
+            # Create couple pairing
+            query = """
+            INSERT INTO couple_pairs (user1_id, user2_id, couple_name, created_at)
+            VALUES (?, ?, ?, ?)
+            """
+            execute_query(query, (invitation['sender_id'], invitation['receiver_id'], invitation['couple_name'], datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            
+            # Update invitation status
+            query = "UPDATE pairing_invitations SET status = 'Accepted' WHERE id = ?"
+            execute_query(query, (invitation_id,))
+            
+            return True, "✅ Invitation accepted! You are now paired!"
         
     except Exception as e:
         return False, f"❌ Error: {str(e)}"
@@ -1,16 +1,151 @@
 import sqlite3
 import os
-from config import DATABASE_PATH
+import queue
+import atexit
+import threading
+from contextlib import contextmanager
+from config import DATABASE_PATH, DB_POOL_SIZE, DB_PRAGMAS, DB_BUSY_TIMEOUT
 
-def get_connection():
+# Idle connections kept alive between queries (and across Streamlit reruns)
+_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+
+# Connection of the transaction() block currently open on this thread
+_local = threading.local()
+
+def configure_connection(conn, pragmas=None):
+    """Apply the connection profile (journal mode, cache, mmap, ...) to a connection"""
+    for name, value in (DB_PRAGMAS if pragmas is None else pragmas).items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+def get_connection(pragmas=None):
     """Get database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = sqlite3.connect(DATABASE_PATH, timeout=DB_BUSY_TIMEOUT / 1000, check_same_thread=False)
     conn.row_factory = sqlite3.Row
-    return conn
+    return configure_connection(conn, pragmas)
+
+def _is_healthy(conn):
+    """Check a pooled connection still works before handing it out"""
+    try:
+        conn.execute("SELECT 1")
+        return True
+    except sqlite3.Error:
+        return False
+
+def acquire_connection():
+    """Take a connection from the pool (or open a new one if the pool is empty)"""
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        return get_connection()
+
+    if _is_healthy(conn):
+        return conn
+
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+    return get_connection()
+
+def release_connection(conn):
+    """Return a connection to the pool (closes it if the pool is full)"""
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+        _pool.put_nowait(conn)
+    except (queue.Full, sqlite3.Error):
+        conn.close()
+
+@contextmanager
+def pooled_connection():
+    """Borrow a pooled connection for the duration of a with-block"""
+    conn = acquire_connection()
+    try:
+        yield conn
+    finally:
+        release_connection(conn)
+
+def close_all_connections():
+    """Close every idle pooled connection (called on shutdown)"""
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+atexit.register(close_all_connections)
+
+def _current_transaction():
+    """Connection of the open transaction() block on this thread, if any"""
+    return getattr(_local, 'conn', None)
+
+def in_transaction():
+    """True inside a transaction() block on this thread"""
+    return _current_transaction() is not None
+
+def on_rollback(callback):
+    """Run callback if the open transaction() block rolls back (e.g. to drop cached ids)"""
+    hooks = getattr(_local, 'rollback_hooks', None)
+    if hooks is not None:
+        hooks.append(callback)
+
+def on_commit(callback):
+    """Run callback once the open transaction() block commits (right away outside a transaction)"""
+    hooks = getattr(_local, 'commit_hooks', None)
+    if hooks is not None:
+        hooks.append(callback)
+    else:
+        callback()
+
+@contextmanager
+def transaction():
+    """
+    Group several queries into one atomic commit
+    Every execute_query/fetch_all/fetch_one inside the block runs on the same
+    connection; errors propagate so the whole block is rolled back.
+    Nested blocks join the outer transaction.
+    """
+    conn = _current_transaction()
+    if conn is not None:
+        yield conn
+        return
+
+    conn = acquire_connection()
+    _local.conn = conn
+    _local.rollback_hooks = []
+    _local.commit_hooks = []
+    try:
+        # Take the write lock up front so read-then-write blocks can't deadlock
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        for callback in _local.rollback_hooks:
+            callback()
+        raise
+    else:
+        for callback in _local.commit_hooks:
+            callback()
+    finally:
+        _local.conn = None
+        _local.rollback_hooks = None
+        _local.commit_hooks = None
+        release_connection(conn)
 
 def execute_query(query, params=None):
     """Execute a database query"""
-    conn = get_connection()
+    tx_conn = _current_transaction()
+    if tx_conn is not None:
+        # Inside transaction(): no commit here, let errors roll back the block
+        return tx_conn.execute(query, params or ())
+
+    conn = acquire_connection()
     cursor = conn.cursor()
     
     try:
@@ -25,11 +160,35 @@ def execute_query(query, params=None):
         conn.rollback()
         return None
     finally:
-        conn.close()
+        release_connection(conn)
+
+def execute_many(query, params_seq):
+    """Execute one statement for every parameter tuple (batched insert/update)"""
+    tx_conn = _current_transaction()
+    if tx_conn is not None:
+        return tx_conn.executemany(query, params_seq)
+
+    conn = acquire_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.executemany(query, params_seq)
+        conn.commit()
+        return cursor
+    except Exception as e:
+        print(f"Database error: {e}")
+        conn.rollback()
+        return None
+    finally:
+        release_connection(conn)
 
 def fetch_all(query, params=None):
     """Fetch all results from a query"""
-    conn = get_connection()
+    tx_conn = _current_transaction()
+    if tx_conn is not None:
+        return tx_conn.execute(query, params or ()).fetchall()
+
+    conn = acquire_connection()
     cursor = conn.cursor()
     
     try:
@@ -43,11 +202,15 @@ def fetch_all(query, params=None):
         print(f"Database error: {e}")
         return []
     finally:
-        conn.close()
+        release_connection(conn)
 
 def fetch_one(query, params=None):
     """Fetch one result from a query"""
-    conn = get_connection()
+    tx_conn = _current_transaction()
+    if tx_conn is not None:
+        return tx_conn.execute(query, params or ()).fetchone()
+
+    conn = acquire_connection()
     cursor = conn.cursor()
     
     try:
@@ -61,4 +224,4 @@ def fetch_one(query, params=None):
         print(f"Database error: {e}")
         return None
     finally:
-        conn.close()
\ No newline at end of file
+        release_connection(conn)
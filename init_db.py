@@ -1,100 +1,110 @@
 import sqlite3
 
-conn = sqlite3.connect('database/budget.db')
-cursor = conn.cursor()
 
-# Create all tables
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT NOT NULL UNIQUE,
-    email TEXT NOT NULL UNIQUE,
-    password_hash TEXT NOT NULL,
-    full_name TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-)
-''')
+def create_tables(conn):
+    """Create all tables (safe to run on an existing database)"""
+    cursor = conn.cursor()
 
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS couple_pairs (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user1_id INTEGER NOT NULL,
-    user2_id INTEGER NOT NULL,
-    couple_name TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user1_id) REFERENCES users(id),
-    FOREIGN KEY (user2_id) REFERENCES users(id)
-)
-''')
+    # Create all tables
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        email TEXT NOT NULL UNIQUE,
+        password_hash TEXT NOT NULL,
+        full_name TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
 
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS categories (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    couple_id INTEGER NOT NULL,
-    category_name TEXT NOT NULL,
-    category_type TEXT NOT NULL,
-    color_code TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (couple_id) REFERENCES couple_pairs(id)
-)
-''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS couple_pairs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user1_id INTEGER NOT NULL,
+        user2_id INTEGER NOT NULL,
+        couple_name TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user1_id) REFERENCES users(id),
+        FOREIGN KEY (user2_id) REFERENCES users(id)
+    )
+    ''')
 
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS transactions (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    couple_id INTEGER NOT NULL,
-    user_id INTEGER NOT NULL,
-    category_id INTEGER NOT NULL,
-    amount DECIMAL(10,2) NOT NULL,
-    description TEXT,
-    transaction_date DATE NOT NULL,
-    transaction_type TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (couple_id) REFERENCES couple_pairs(id),
-    FOREIGN KEY (user_id) REFERENCES users(id),
-    FOREIGN KEY (category_id) REFERENCES categories(id)
-)
-''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        couple_id INTEGER NOT NULL,
+        category_name TEXT NOT NULL,
+        category_type TEXT NOT NULL,
+        color_code TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (couple_id) REFERENCES couple_pairs(id)
+    )
+    ''')
 
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS budgets (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    couple_id INTEGER NOT NULL,
-    category_id INTEGER NOT NULL,
-    planned_amount DECIMAL(10,2) NOT NULL,
-    month_year TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (couple_id) REFERENCES couple_pairs(id),
-    FOREIGN KEY (category_id) REFERENCES categories(id)
-)
-''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        couple_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        amount DECIMAL(10,2) NOT NULL,
+        description TEXT,
+        transaction_date DATE NOT NULL,
+        transaction_type TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (couple_id) REFERENCES couple_pairs(id),
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (category_id) REFERENCES categories(id)
+    )
+    ''')
 
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS shared_accounts (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    couple_id INTEGER NOT NULL,
-    account_name TEXT NOT NULL,
-    balance DECIMAL(12,2) DEFAULT 0.00,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (couple_id) REFERENCES couple_pairs(id)
-)
-''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS budgets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        couple_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        planned_amount DECIMAL(10,2) NOT NULL,
+        month_year TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (couple_id) REFERENCES couple_pairs(id),
+        FOREIGN KEY (category_id) REFERENCES categories(id)
+    )
+    ''')
 
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS recurring_transactions (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    couple_id INTEGER NOT NULL,
-    category_name TEXT NOT NULL,
-    amount DECIMAL(10,2) NOT NULL,
-    frequency TEXT NOT NULL,
-    next_date DATE NOT NULL,
-    description TEXT,
-    status TEXT DEFAULT 'Active',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (couple_id) REFERENCES couple_pairs(id)
-)
-''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS shared_accounts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        couple_id INTEGER NOT NULL,
+        account_name TEXT NOT NULL,
+        balance DECIMAL(12,2) DEFAULT 0.00,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (couple_id) REFERENCES couple_pairs(id)
+    )
+    ''')
 
-conn.commit()
-conn.close()
-print("✓ Database created successfully!")
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS recurring_transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        couple_id INTEGER NOT NULL,
+        category_name TEXT NOT NULL,
+        amount DECIMAL(10,2) NOT NULL,
+        frequency TEXT NOT NULL,
+        next_date DATE NOT NULL,
+        description TEXT,
+        status TEXT DEFAULT 'Active',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (couple_id) REFERENCES couple_pairs(id)
+    )
+    ''')
+
+    conn.commit()
+
+
+if __name__ == '__main__':
+    conn = sqlite3.connect('database/budget.db')
+    create_tables(conn)
+    conn.close()
+    print("✓ Database created successfully!")
+
+    from migrations import upgrade_database
+    upgrade_database()
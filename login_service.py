@@ -0,0 +1,124 @@
+"""
+Login service
+bcrypt checks run on a bounded thread pool (LOGIN_WORKERS) instead of inline:
+a burst of logins queues behind a fixed number of hashes rather than every
+session hashing at once, and the user and admin passwords are checked at
+the same time instead of one after the other. When more than
+LOGIN_QUEUE_LIMIT checks are waiting, new logins are turned away early.
+After a successful login, a hash made at a lower bcrypt cost is re-hashed at
+the calibrated one in the background. Queue depth and latency percentiles
+are kept for the admin page.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from config import LOGIN_QUEUE_LIMIT, LOGIN_TIMEOUT, LOGIN_WORKERS
+from db_connection import fetch_one
+from authentication import bcrypt_rounds, rehash_password, verify_password
+from admin import ADMIN_USERNAME, is_admin
+from login_throttle import check_login_allowed, record_failure, record_success
+
+_executor = ThreadPoolExecutor(max_workers=LOGIN_WORKERS, thread_name_prefix='login-bcrypt')
+_lock = threading.Lock()
+_latencies = deque(maxlen=1000)  # seconds per login, most recent
+_stats = {'queued': 0, 'running': 0, 'logins': 0, 'rejected': 0, 'timeouts': 0, 'rehashed': 0}
+
+
+def _run(check, *args):
+    with _lock:
+        _stats['queued'] -= 1
+        _stats['running'] += 1
+    try:
+        return check(*args)
+    finally:
+        with _lock:
+            _stats['running'] -= 1
+
+
+def _submit(check, *args):
+    """Queue a password check, None when the queue is full"""
+    with _lock:
+        if _stats['queued'] >= LOGIN_QUEUE_LIMIT:
+            _stats['rejected'] += 1
+            return None
+        _stats['queued'] += 1
+    return _executor.submit(_run, check, *args)
+
+
+def _count_rehash(future):
+    if not future.cancelled() and future.exception() is None and future.result():
+        with _lock:
+            _stats['rehashed'] += 1
+
+
+def login(username, password, session_id=None, timeout=LOGIN_TIMEOUT):
+    """
+    Check a user's password, and the admin password when they log in as admin
+    Throttled usernames/sessions (login_throttle) are turned away before any lookup or hashing.
+    Returns (success, user_info, message, is_admin) - user_info without the password hash
+    """
+    allowed, retry_after = check_login_allowed(username, session_id)
+    if not allowed:
+        return False, None, f"Too many failed logins, try again in {(retry_after + 59) // 60} minute(s)", False
+
+    query = "SELECT id, username, email, full_name, password_hash FROM users WHERE username = ?"
+    user = fetch_one(query, (username,))
+
+    if not user:
+        # Unknown names only count against the session (see record_failure)
+        record_failure(None, session_id)
+        return False, None, "Username not found", False
+
+    started = time.perf_counter()
+    user_check = _submit(verify_password, password, user['password_hash'])
+    admin_check = _submit(is_admin, username, password) if username == ADMIN_USERNAME else None
+    if user_check is None or (username == ADMIN_USERNAME and admin_check is None):
+        for check in (user_check, admin_check):
+            if check is not None and check.cancel():
+                with _lock:
+                    _stats['queued'] -= 1
+        return False, None, "Too many logins right now, please try again in a moment", False
+
+    try:
+        valid = user_check.result(timeout=timeout)
+        admin = admin_check.result(timeout=timeout) if admin_check else False
+    except TimeoutError:
+        with _lock:
+            _stats['timeouts'] += 1
+        return False, None, "Login timed out, please try again", False
+
+    with _lock:
+        _stats['logins'] += 1
+        _latencies.append(time.perf_counter() - started)
+
+    if not valid:
+        record_failure(username, session_id)
+        return False, None, "Incorrect password", False
+
+    record_success(username)
+
+    # Upgrade hashes made at a lower cost in the background; the login doesn't wait
+    rehash = _submit(rehash_password, user['id'], password, user['password_hash'])
+    if rehash is not None:
+        rehash.add_done_callback(_count_rehash)
+
+    return True, {
+        'id': user['id'],
+        'username': user['username'],
+        'email': user['email'],
+        'full_name': user['full_name']
+    }, "Login successful!", admin
+
+
+def get_login_stats():
+    """Queue depth, counters and p50/p95 login latency (ms) over the last 1000 logins"""
+    with _lock:
+        stats = dict(_stats)
+        latencies = sorted(_latencies)
+
+    stats['workers'] = LOGIN_WORKERS
+    stats['bcrypt_rounds'] = bcrypt_rounds()
+    stats['p50_ms'] = latencies[int(0.50 * (len(latencies) - 1))] * 1000 if latencies else 0.0
+    stats['p95_ms'] = latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0.0
+    return stats
@@ -0,0 +1,119 @@
+"""
+Login throttle
+Sliding-window limit on failed logins, per username and per browser session:
+once a key has LOGIN_THROTTLE_*_ATTEMPTS failures inside the last
+LOGIN_THROTTLE_WINDOW seconds, further attempts are turned away before the
+user lookup and the bcrypt check. Each key keeps only its most recent failure
+times. Usernames and sessions are kept apart, each bounded to
+LOGIN_THROTTLE_MAX_KEYS (least recently used dropped first), and only real
+accounts get a username key, so neither made-up names nor fresh sessions can
+push a real account's failures out. With LOGIN_THROTTLE_PERSIST failures are also written to
+login_failures, so a restart doesn't reset the window (a key is read from the
+table the first time this process sees it).
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from config import (LOGIN_THROTTLE_MAX_KEYS, LOGIN_THROTTLE_PERSIST, LOGIN_THROTTLE_SESSION_ATTEMPTS,
+                    LOGIN_THROTTLE_USER_ATTEMPTS, LOGIN_THROTTLE_WINDOW)
+from db_connection import execute_query, fetch_all
+
+_failures = {'user': OrderedDict(), 'session': OrderedDict()}  # key -> deque of failure times (newest last)
+_lock = threading.Lock()
+_stats = {'checks': 0, 'throttled': 0, 'failures': 0, 'evictions': 0}
+
+
+def _keys(username, session_id):
+    """(key, allowed failures) pairs an attempt counts against"""
+    keys = []
+    if username:
+        keys.append((f"user:{username.lower()}", LOGIN_THROTTLE_USER_ATTEMPTS))
+    if session_id:
+        keys.append((f"session:{session_id}", LOGIN_THROTTLE_SESSION_ATTEMPTS))
+    return keys
+
+
+def _window(key, limit, now, create=True):
+    """
+    Recent failure times of a key (loaded from login_failures on first use), call with _lock held
+    Without create, a key with no failures isn't stored, so lookups alone never take a slot.
+    """
+    store = _failures[key.split(':', 1)[0]]
+    times = store.get(key)
+    if times is not None:
+        store.move_to_end(key)
+        return times
+
+    times = deque(maxlen=limit)
+    if LOGIN_THROTTLE_PERSIST:
+        query = """
+        SELECT attempted_at FROM login_failures
+        WHERE throttle_key = ? AND attempted_at > ?
+        ORDER BY attempted_at DESC
+        LIMIT ?
+        """
+        rows = fetch_all(query, (key, now - LOGIN_THROTTLE_WINDOW, limit))
+        times.extend(sorted(row['attempted_at'] for row in rows))
+
+    if times or create:
+        store[key] = times
+        while len(store) > LOGIN_THROTTLE_MAX_KEYS:
+            store.popitem(last=False)
+            _stats['evictions'] += 1
+    return times
+
+
+def check_login_allowed(username, session_id=None):
+    """
+    Whether a login attempt may go ahead
+    Returns (allowed, retry_after_seconds)
+    """
+    now = time.time()
+    retry_after = 0
+    with _lock:
+        _stats['checks'] += 1
+        for key, limit in _keys(username, session_id):
+            times = _window(key, limit, now, create=False)
+            # Only the last `limit` failures are kept: throttled while the oldest is in the window
+            if len(times) >= limit and times[0] > now - LOGIN_THROTTLE_WINDOW:
+                retry_after = max(retry_after, times[0] + LOGIN_THROTTLE_WINDOW - now)
+        if retry_after:
+            _stats['throttled'] += 1
+    return not retry_after, int(retry_after) + 1 if retry_after else 0
+
+
+def record_failure(username, session_id=None):
+    """
+    Count a failed login against the username and the session
+    Pass username=None for names that don't exist: only real accounts get a
+    username slot, so spraying made-up names can't evict a real account's window.
+    """
+    now = time.time()
+    keys = _keys(username, session_id)
+    with _lock:
+        _stats['failures'] += 1
+        for key, limit in keys:
+            _window(key, limit, now).append(now)
+
+    if LOGIN_THROTTLE_PERSIST:
+        for key, _ in keys:
+            execute_query("DELETE FROM login_failures WHERE throttle_key = ? AND attempted_at <= ?", (key, now - LOGIN_THROTTLE_WINDOW))
+            execute_query("INSERT INTO login_failures (throttle_key, attempted_at) VALUES (?, ?)", (key, now))
+
+
+def record_success(username):
+    """A correct password clears the username's failures (the session's keep counting)"""
+    key = _keys(username, None)[0][0]
+    with _lock:
+        _failures['user'].pop(key, None)
+
+    if LOGIN_THROTTLE_PERSIST:
+        execute_query("DELETE FROM login_failures WHERE throttle_key = ?", (key,))
+
+
+def get_throttle_stats():
+    """Check/throttle/failure counters plus tracked usernames and sessions"""
+    with _lock:
+        stats = dict(_stats)
+        stats['keys'] = len(_failures['user']) + len(_failures['session'])
+    return stats
@@ -1,16 +1,25 @@
 # 🛡️ Validate environment configuration before app starts
 from env_validator import validate_env_file
 validate_env_file()
+# 🗄️ Bring the database schema up to date (runs once per process)
+from migrations import upgrade_database
+upgrade_database()
+# 🔐 Pick the bcrypt cost for this machine (micro-benchmark, once per process)
+from authentication import bcrypt_rounds
+bcrypt_rounds()
 import streamlit as st
 import pandas as pd
-from authentication import login_user, register_user
-from transactions import save_transaction, get_user_transactions, get_category_summary, get_monthly_total, save_budget, get_budgets, get_budget_vs_actual, edit_transaction, delete_transaction_user
+from authentication import register_user
+from login_service import login, get_login_stats
+from login_throttle import get_throttle_stats
+from transactions import save_transaction, get_user_transactions_page, count_user_transactions, get_dashboard_snapshot, save_budget, get_budgets, get_budget_vs_actual, edit_transaction, delete_transaction_user
 from couple_pairing import send_pairing_request, get_couple_id, get_partner_info, unpair_couple
 from db_connection import execute_query, fetch_all, fetch_one
 from config import APP_NAME, DEFAULT_CATEGORIES
 from security import check_session_timeout
 from admin import is_admin, get_all_users, delete_user, get_user_details, get_system_stats, get_all_transactions, delete_transaction, reset_user_password
 import time
+import uuid
 import datetime
 from reports import export_to_excel
 
@@ -68,7 +77,10 @@ if not st.session_state.logged_in:
         
         if st.button("Login"):
             if username and password:
-                success, user, message = login_user(username, password)
+                # User and admin passwords are checked together on the login pool
+                if 'login_session_id' not in st.session_state:
+                    st.session_state.login_session_id = uuid.uuid4().hex
+                success, user, message, is_user_admin = login(username, password, st.session_state.login_session_id)
                 if success:
                     st.session_state.logged_in = True
                     st.session_state.user_id = user['id']
@@ -77,8 +89,6 @@ if not st.session_state.logged_in:
 
 
                     # Check if admin
-                    from security import sanitize_input
-                    is_user_admin = (user['username'] == 'admin')
                     st.session_state.is_admin = is_user_admin
 
 
@@ -159,6 +169,12 @@ else:
 
 
     menu = st.sidebar.radio("Navigation", menu_items)
+    
+    # Build last month's reports in the background once per session
+    if st.session_state.couple_id and not st.session_state.get('reports_prebuilt'):
+        from report_store import prebuild_reports
+        prebuild_reports(st.session_state.couple_id)
+        st.session_state.reports_prebuilt = True
 
 
 
@@ -176,21 +192,13 @@ else:
     if menu == "Dashboard":
         st.subheader("📊 Dashboard")
         
-        # Get monthly totals
-        monthly_data = get_monthly_total(st.session_state.couple_id)
-        category_data = get_category_summary(st.session_state.couple_id)
-        
-        # Calculate totals
-        total_income = 0
-        total_expenses = 0
-        
-        for item in monthly_data:
-            if item['transaction_type'] == 'Income':
-                total_income = item['total']
-            else:
-                total_expenses = item['total']
+        # Totals, categories, budgets and upcoming subscriptions in one call
+        snapshot = get_dashboard_snapshot(st.session_state.couple_id)
+        category_data = snapshot['categories']
         
-        net = total_income - total_expenses
+        total_income = snapshot['income']
+        total_expenses = snapshot['expenses']
+        net = snapshot['net']
         
         # Display summary cards
         col1, col2, col3 = st.columns(3)
@@ -234,6 +242,19 @@ else:
         else:
             st.info("Add some transactions to see your dashboard!")
         
+        # Budget progress for this month
+        if snapshot['budgets']:
+            st.subheader("🎯 Budget Progress")
+            for budget in snapshot['budgets']:
+                st.write(f"**{budget['category_name']}**: R{budget['actual']:.2f} of R{budget['budgeted']:.2f}")
+                st.progress(min(budget['percent'] / 100, 1.0))
+        
+        # Subscriptions due soon
+        if snapshot['upcoming']:
+            st.subheader("📅 Upcoming Subscriptions")
+            for sub in snapshot['upcoming']:
+                st.caption(f"{sub['next_date']} · {sub['category_name']} · R{sub['amount']:.2f} ({sub['frequency']})")
+        
     elif menu == "Add Transaction":
         st.subheader("Add Transaction")
         
@@ -273,15 +294,76 @@ else:
                         st.error(message)
                 else:
                     st.error("Please fill in all fields")
+        
+        st.divider()
+        
+        with st.expander("📥 Import Bank Statement (CSV / OFX)"):
+            st.caption("CSV needs a date column and an amount (or debit/credit) column. Negative amounts are imported as expenses.")
+            
+            statement_file = st.file_uploader("Statement file", type=["csv", "ofx", "qfx"], key="import_statement_file")
+            import_categories = list(DEFAULT_CATEGORIES.keys()) + ["Uncategorised"]
+            import_category = st.selectbox(
+                "Category for lines without one",
+                import_categories,
+                index=len(import_categories) - 1,
+                key="import_category"
+            )
+            
+            if st.button("📥 Import Statement", use_container_width=True):
+                if statement_file:
+                    if not st.session_state.couple_id:
+                        st.session_state.couple_id = st.session_state.user_id
+                    
+                    from bank_import import import_statement
+                    with st.spinner("⏳ Importing statement..."):
+                        report = import_statement(
+                            statement_file,
+                            couple_id=st.session_state.couple_id,
+                            user_id=st.session_state.user_id,
+                            default_category=import_category
+                        )
+                    
+                    st.success(f"✅ Imported {report['imported']} of {report['rows']} lines ({report['rows_per_sec']:.0f} lines/sec)")
+                    if report['duplicates']:
+                        st.info(f"⚠️ Skipped {report['duplicates']} duplicate(s) already in your history")
+                    if report['rejected']:
+                        st.warning(f"❌ {len(report['rejected'])} line(s) rejected")
+                        st.dataframe(pd.DataFrame(report['rejected'], columns=['Line', 'Reason']), hide_index=True)
+                else:
+                    st.error("Please choose a statement file")
 
     
     elif menu == "View Transactions":
         st.subheader("View Transactions")
         
-        transactions = get_user_transactions(st.session_state.couple_id, st.session_state.user_id)
+        # Keyset pagination: remember the cursor of every page visited so "Newer" can step back
+        if 'trans_page_cursors' not in st.session_state:
+            st.session_state.trans_page_cursors = [None]
+        
+        page_size = st.selectbox(
+            "Rows per page",
+            [25, 50, 100],
+            index=1,
+            key="trans_page_size",
+            on_change=lambda: st.session_state.update(trans_page_cursors=[None])
+        )
+        page_cursors = st.session_state.trans_page_cursors
+        
+        transactions, next_cursor = get_user_transactions_page(
+            st.session_state.couple_id,
+            st.session_state.user_id,
+            after=page_cursors[-1],
+            limit=page_size
+        )
+        
+        # Page emptied (e.g. last row deleted) - go back to the first page
+        if not transactions and len(page_cursors) > 1:
+            st.session_state.trans_page_cursors = [None]
+            st.rerun()
         
         if transactions:
-            st.write(f"**Total Transactions: {len(transactions)}**")
+            total_transactions = count_user_transactions(st.session_state.couple_id, st.session_state.user_id)
+            st.write(f"**Total Transactions: {total_transactions}** · Page {len(page_cursors)}")
             st.divider()
             
             for trans in transactions:
@@ -325,6 +407,16 @@ else:
                 
                 st.divider()
             
+            nav_col1, nav_col2 = st.columns(2)
+            with nav_col1:
+                if st.button("⬅️ Newer", disabled=len(page_cursors) == 1, use_container_width=True):
+                    page_cursors.pop()
+                    st.rerun()
+            with nav_col2:
+                if st.button("Older ➡️", disabled=next_cursor is None, use_container_width=True):
+                    page_cursors.append(next_cursor)
+                    st.rerun()
+            
             # Edit Transaction Form (if edit button clicked)
             if st.session_state.get('show_edit_form', False):
                 st.subheader("✏️ Edit Transaction")
@@ -520,6 +612,16 @@ else:
                     st.write(f"🔔 **{sub['category_name']}** - R{sub['amount']:.2f} on {sub['next_date']}")
             else:
                 st.info("No subscriptions due in next 30 days")
+            
+            # Every occurrence of every active subscription over the next year
+            from projections import project_recurring
+            forecast = project_recurring(st.session_state.couple_id, months=12)
+            if forecast['monthly'].any():
+                st.subheader("📈 12-Month Cash-Flow Forecast")
+                st.bar_chart(pd.DataFrame(
+                    {'Projected (R)': forecast['monthly']},
+                    index=[str(month) for month in forecast['months']]
+                ))
     
     elif menu == "Budgets":
         st.subheader("💰 Budget Management")
@@ -621,21 +723,21 @@ else:
         
         # Format choice
         export_format = st.radio("Choose export format:", ["📊 Excel", "📄 PDF"], horizontal=True)
+        summary_only = export_format == "📄 PDF" and st.checkbox("Summary only (skip the transaction list)", key="report_summary_only")
         
         st.write("Click the button below to generate your report:")
         
         if st.button("📥 Generate & Download Report", use_container_width=True):
             with st.spinner("⏳ Generating report..."):
+                from report_store import get_report
                 if export_format == "📊 Excel":
-                    from reports import export_to_excel
-                    file_data = export_to_excel(st.session_state.couple_id, report_month, report_year)
                     file_ext = "xlsx"
                     mime_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 else:
-                    from reports import export_to_pdf
-                    file_data = export_to_pdf(st.session_state.couple_id, report_month, report_year)
                     file_ext = "pdf"
                     mime_type = "application/pdf"
+                # Served from the report store unless the month's data changed since it was built
+                file_data = get_report(st.session_state.couple_id, report_month, report_year, "summary_pdf" if summary_only else file_ext)
                 
                 if file_data:
                     month_name = datetime(report_year, report_month, 1).strftime('%B %Y')
@@ -658,6 +760,100 @@ else:
                 "• **Budget vs Actual** - Spending compared to budgets\n"
                 "• **Subscriptions** - All active subscriptions")
         
+        st.divider()
+        
+        # Quarter / year / custom range in one pass, with month-by-month trends
+        st.subheader("📆 Quarterly, Yearly & Custom Reports")
+        
+        range_type = st.radio("Period", ["Quarter", "Year", "Custom"], horizontal=True, key="range_report_type")
+        from periods import quarter_bounds, year_bounds
+        if range_type == "Quarter":
+            col1, col2 = st.columns(2)
+            with col1:
+                range_quarter = st.selectbox("Quarter", [1, 2, 3, 4], index=(now.month - 1) // 3, key="range_report_quarter")
+            with col2:
+                range_year = st.selectbox("Year", range(2024, now.year + 1), index=now.year - 2024, key="range_report_q_year")
+            range_start, range_end = quarter_bounds(range_quarter, range_year)
+            range_title = f"Q{range_quarter} {range_year}"
+        elif range_type == "Year":
+            range_year = st.selectbox("Year", range(2024, now.year + 1), index=now.year - 2024, key="range_report_year")
+            range_start, range_end = year_bounds(range_year)
+            range_title = str(range_year)
+        else:
+            from datetime import timedelta
+            col1, col2 = st.columns(2)
+            with col1:
+                custom_start = st.date_input("From", datetime(now.year, 1, 1), key="range_report_start")
+            with col2:
+                custom_end = st.date_input("To (inclusive)", now.date(), key="range_report_end")
+            range_start, range_end = custom_start, custom_end + timedelta(days=1)
+            range_title = f"{custom_start} to {custom_end}"
+        
+        range_format = st.radio("Format", ["📊 Excel", "📄 PDF"], horizontal=True, key="range_report_format")
+        
+        if st.button("📥 Generate Range Report", use_container_width=True):
+            if range_type == "Custom" and custom_end < custom_start:
+                st.error("❌ The end date must be after the start date")
+            else:
+                with st.spinner("⏳ Generating report..."):
+                    from reports import export_range_to_excel, export_range_to_pdf
+                    if range_format == "📊 Excel":
+                        range_data = export_range_to_excel(st.session_state.couple_id, range_start, range_end, range_title)
+                        range_ext, range_mime = "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    else:
+                        range_data = export_range_to_pdf(st.session_state.couple_id, range_start, range_end, range_title)
+                        range_ext, range_mime = "pdf", "application/pdf"
+                
+                if range_data:
+                    st.download_button(
+                        label=f"⬇️ Download {range_title} Report ({range_ext.upper()})",
+                        data=range_data,
+                        file_name=f"Budget_Report_{range_title.replace(' ', '_')}.{range_ext}",
+                        mime=range_mime,
+                        use_container_width=True
+                    )
+                else:
+                    st.error("❌ Error generating report - please check your data")
+        
+        st.divider()
+        
+        # Full history / custom range export, streamed from the database in chunks
+        st.subheader("📦 Export Transaction History")
+        
+        export_all = st.checkbox("Full history", value=True, key="history_export_all")
+        col1, col2 = st.columns(2)
+        with col1:
+            history_start = st.date_input("From", datetime(now.year, 1, 1), key="history_export_start", disabled=export_all)
+        with col2:
+            history_end = st.date_input("To (inclusive)", now.date(), key="history_export_end", disabled=export_all)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            history_format = st.radio("Format", ["csv", "ndjson"], horizontal=True, key="history_export_format")
+        with col2:
+            history_gzip = st.checkbox("Compress (gzip)", key="history_export_gzip")
+        
+        def build_history_export():
+            """Spool the streamed export (only runs when the download is clicked)"""
+            import tempfile
+            from datetime import timedelta
+            from reports import iter_transactions_export
+            start, end = (None, None) if export_all else (history_start, history_end + timedelta(days=1))
+            spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+            for chunk in iter_transactions_export(st.session_state.couple_id, start, end, history_format, history_gzip):
+                spool.write(chunk)
+            spool.seek(0)
+            return spool
+        
+        history_name = "Transactions_All" if export_all else f"Transactions_{history_start}_{history_end}"
+        st.download_button(
+            label="⬇️ Download Transaction History",
+            data=build_history_export,
+            file_name=f"{history_name}.{history_format}{'.gz' if history_gzip else ''}",
+            mime="application/gzip" if history_gzip else ("text/csv" if history_format == "csv" else "application/x-ndjson"),
+            use_container_width=True
+        )
+        
     elif menu == "Settings":
         st.subheader("⚙️ Settings")
         
@@ -800,6 +996,28 @@ else:
                 st.metric("💳 Transactions", stats.get('total_transactions', 0))
             with col4:
                 st.metric("💰 Budgets", stats.get('total_budgets', 0))
+            
+            from query_cache import get_cache_stats
+            cache_stats = get_cache_stats()
+            st.caption(
+                f"🗃️ Query cache: {cache_stats['hit_rate']:.0%} hit rate "
+                f"({cache_stats['hits']} hits / {cache_stats['misses']} misses), "
+                f"{cache_stats['size']} entries, {cache_stats['evictions']} evicted, "
+                f"{cache_stats['invalidations']} invalidations"
+            )
+            login_stats = get_login_stats()
+            st.caption(
+                f"🔐 Logins: p95 {login_stats['p95_ms']:.0f} ms (p50 {login_stats['p50_ms']:.0f} ms), "
+                f"{login_stats['queued']} queued / {login_stats['running']} hashing on {login_stats['workers']} workers, "
+                f"{login_stats['rejected']} turned away, {login_stats['timeouts']} timed out, "
+                f"{login_stats['rehashed']} hashes upgraded to cost {login_stats['bcrypt_rounds']}"
+            )
+            throttle_stats = get_throttle_stats()
+            st.caption(
+                f"🚦 Login throttle: {throttle_stats['throttled']} of {throttle_stats['checks']} attempts blocked, "
+                f"{throttle_stats['failures']} failures, {throttle_stats['keys']} usernames/sessions tracked, "
+                f"{throttle_stats['evictions']} evicted"
+            )
         
         with admin_tab2:
             st.subheader("User Accounts & Transactions")
@@ -0,0 +1,182 @@
+"""
+Versioned schema migrations
+Each migration runs once, in order, inside its own transaction and is
+recorded in the schema_version table. Safe to call on every startup.
+Usage: python migrations.py
+"""
+from db_connection import pooled_connection
+
+# Schema version once this process has brought the database up to date
+_schema_version = None
+
+
+def _merge_duplicate_categories(conn):
+    """Point transactions/budgets at the oldest copy of a duplicated category, then drop the copies"""
+    duplicates = conn.execute("""
+    SELECT c.id, keep.id AS keep_id
+    FROM categories c
+    JOIN (
+        SELECT couple_id, category_name, MIN(id) AS id
+        FROM categories
+        GROUP BY couple_id, category_name
+        HAVING COUNT(*) > 1
+    ) keep ON c.couple_id = keep.couple_id AND c.category_name = keep.category_name AND c.id != keep.id
+    """).fetchall()
+
+    for category_id, keep_id in duplicates:
+        conn.execute("UPDATE transactions SET category_id = ? WHERE category_id = ?", (keep_id, category_id))
+        conn.execute("UPDATE budgets SET category_id = ? WHERE category_id = ?", (keep_id, category_id))
+        conn.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+
+
+def _remove_duplicate_budgets(conn):
+    """Keep only the newest budget per couple, month and category"""
+    conn.execute("""
+    DELETE FROM budgets
+    WHERE id NOT IN (
+        SELECT MAX(id) FROM budgets GROUP BY couple_id, month_year, category_id
+    )
+    """)
+
+
+def _backfill_fingerprints(conn):
+    """
+    Fingerprint existing transactions
+    Of a group of exact duplicates only the oldest (lowest id) row gets the fingerprint;
+    the newer copies keep a NULL fingerprint, so dedupe protects the original entry.
+    """
+    from transactions import transaction_fingerprint
+
+    seen = set()
+    updates = []
+    rows = conn.execute("""
+    SELECT id, couple_id, category_id, amount, transaction_date, description, transaction_type
+    FROM transactions ORDER BY id
+    """)
+    for row in rows:
+        fingerprint = transaction_fingerprint(*row[1:])
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            updates.append((fingerprint, row[0]))
+
+    conn.executemany("UPDATE transactions SET fingerprint = ? WHERE id = ?", updates)
+
+
+# (version, description, steps) - a step is an SQL string or a function taking the connection
+MIGRATIONS = [
+    (1, "Index transactions by couple and date", [
+        "CREATE INDEX IF NOT EXISTS idx_transactions_couple_date ON transactions (couple_id, transaction_date)",
+    ]),
+    (2, "Index transactions for duplicate checks and category totals", [
+        "CREATE INDEX IF NOT EXISTS idx_transactions_couple_category ON transactions (couple_id, category_id, amount, transaction_date)",
+    ]),
+    (3, "Unique category names per couple", [
+        _merge_duplicate_categories,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_categories_couple_name ON categories (couple_id, category_name)",
+    ]),
+    (4, "One budget per couple, month and category", [
+        _remove_duplicate_budgets,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_budgets_couple_month_category ON budgets (couple_id, month_year, category_id)",
+    ]),
+    (5, "Index recurring transactions by status and due date", [
+        "CREATE INDEX IF NOT EXISTS idx_recurring_couple_status_next ON recurring_transactions (couple_id, status, next_date)",
+    ]),
+    (6, "Monthly per-category totals rollup", [
+        """
+        CREATE TABLE IF NOT EXISTS monthly_category_totals (
+            couple_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            transaction_type TEXT NOT NULL,
+            total DECIMAL(12,2) NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (couple_id, month, category_id, transaction_type)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO monthly_category_totals (couple_id, month, category_id, transaction_type, total, count)
+        SELECT couple_id, substr(transaction_date, 1, 7), category_id, transaction_type, SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY couple_id, substr(transaction_date, 1, 7), category_id, transaction_type
+        """,
+    ]),
+    (7, "Transaction fingerprints for index-backed duplicate detection", [
+        "ALTER TABLE transactions ADD COLUMN fingerprint TEXT",
+        _backfill_fingerprints,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_fingerprint ON transactions (fingerprint)",
+    ]),
+    (8, "Index transactions by couple, user and date for paged listings", [
+        "CREATE INDEX IF NOT EXISTS idx_transactions_couple_user_date ON transactions (couple_id, user_id, transaction_date)",
+    ]),
+    (9, "Due recurring items index and scheduler leases", [
+        "CREATE INDEX IF NOT EXISTS idx_recurring_status_next ON recurring_transactions (status, next_date, couple_id)",
+        """
+        CREATE TABLE IF NOT EXISTS recurring_leases (
+            couple_id INTEGER PRIMARY KEY,
+            worker_id TEXT NOT NULL,
+            expires_at TEXT NOT NULL
+        )
+        """,
+    ]),
+    (10, "Failed login attempts for the login throttle", [
+        """
+        CREATE TABLE IF NOT EXISTS login_failures (
+            throttle_key TEXT NOT NULL,
+            attempted_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_login_failures_key_time ON login_failures (throttle_key, attempted_at)",
+    ]),
+]
+
+
+def get_schema_version(conn):
+    """Highest migration applied to the database (0 for a fresh one)"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def apply_migrations(conn, verbose=True):
+    """Apply every pending migration on an open connection, returns the resulting schema version"""
+    version = 0
+    for target, description, steps in MIGRATIONS:
+        # Take the write lock before reading the version so two processes never apply the same migration
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = get_schema_version(conn)
+            if target > version:
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+
+                conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)", (target, description))
+                version = target
+                if verbose:
+                    print(f"✓ Migration {target}: {description}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    return version
+
+
+def upgrade_database():
+    """Bring the application database up to date (only does work once per process)"""
+    global _schema_version
+    if _schema_version is None:
+        with pooled_connection() as conn:
+            _schema_version = apply_migrations(conn)
+    return _schema_version
+
+
+if __name__ == '__main__':
+    print(f"✓ Schema is at version {upgrade_database()}")
@@ -0,0 +1,79 @@
+"""
+Date-range helpers for transaction filters
+Dates are stored as 'YYYY-MM-DD' text, so plain >= / < comparisons sort
+correctly and let SQLite use the (couple_id, transaction_date) index,
+unlike strftime() on every row.
+"""
+from datetime import date, datetime, timedelta
+
+
+def _to_iso(value):
+    """Accept date/datetime objects or 'YYYY-MM-DD' strings"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def month_bounds(month, year):
+    """First day of the month and first day of the following month"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def month_key(month, year):
+    """'YYYY-MM' key used by budgets.month_year and the monthly rollup"""
+    return f"{year}-{month:02d}"
+
+
+def quarter_bounds(quarter, year):
+    """First day of the quarter (1-4) and first day of the following quarter"""
+    start = date(year, 3 * (quarter - 1) + 1, 1)
+    return start.isoformat(), month_bounds(3 * quarter, year)[1]
+
+
+def year_bounds(year):
+    """First day of the year and first day of the next one"""
+    return date(year, 1, 1).isoformat(), date(year + 1, 1, 1).isoformat()
+
+
+def month_keys(start, end):
+    """'YYYY-MM' keys of every month touched by the half-open range [start, end)"""
+    start = date.fromisoformat(_to_iso(start))
+    last = date.fromisoformat(_to_iso(end)) - timedelta(days=1)
+    
+    keys = []
+    year, month = start.year, start.month
+    while (year, month) <= (last.year, last.month):
+        keys.append(month_key(month, year))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return keys
+
+
+def date_range_filter(column, start=None, end=None):
+    """
+    Half-open range predicate: column >= start AND column < end
+    Either bound may be None. Returns (sql, params) ready to splice into a WHERE/ON clause.
+    """
+    clauses = []
+    params = []
+
+    if start is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(_to_iso(start))
+
+    if end is not None:
+        clauses.append(f"{column} < ?")
+        params.append(_to_iso(end))
+
+    if not clauses:
+        return "1 = 1", params
+
+    return " AND ".join(clauses), params
+
+
+def month_filter(column, month, year):
+    """Range predicate covering one calendar month"""
+    return date_range_filter(column, *month_bounds(month, year))
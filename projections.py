@@ -0,0 +1,174 @@
+"""
+Recurring cash-flow projections
+Expands every active recurring item into its exact occurrence dates over a
+horizon with NumPy date arithmetic, following recurring.calculate_next_date:
+weekly/bi-weekly items step by 7/14 days; monthly, quarterly and yearly items
+step by 1/3/12 months and clamp the day to the month length, and a clamped
+day never grows back (Jan 31 -> Feb 28 -> Mar 28), i.e. the day is a running
+minimum.
+"""
+import numpy as np
+from datetime import date
+from db_connection import fetch_all
+
+DAY_STEPS = {'Weekly': 7, 'Bi-weekly': 14}
+MONTH_STEPS = {'Monthly': 1, 'Quarterly': 3, 'Yearly': 12}
+
+# Occurrences per year, used for average monthly cost
+OCCURRENCES_PER_YEAR = {
+    'Weekly': 365.2425 / 7,
+    'Bi-weekly': 365.2425 / 14,
+    'Monthly': 12,
+    'Quarterly': 4,
+    'Yearly': 1,
+}
+
+
+def _month_grid(first, step, columns):
+    """
+    Dates of `columns` month-stepped occurrences per row, starting at first (column 0)
+    The day is clamped to each month's length and never grows back, like calculate_next_date.
+    """
+    first_month = first.astype('datetime64[M]')
+    months = first_month[:, None] + np.arange(columns) * step
+    month_days = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(int)
+    first_day = (first - first_month.astype('datetime64[D]')).astype(int) + 1
+    # Clamp to each month's length and carry the smallest day forward
+    days = np.minimum.accumulate(np.minimum(first_day[:, None], month_days), axis=1)
+    return months.astype('datetime64[D]') + (days - 1)
+
+
+def advance_dates(dates, frequencies, steps=1):
+    """
+    Batch calculate_next_date: move every date `steps` occurrences ahead
+    steps may be one number or one per date; unknown frequencies stay put.
+    Returns a datetime64[D] array.
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    frequencies = np.asarray(frequencies)
+    steps = np.broadcast_to(np.asarray(steps, dtype=int), dates.shape)
+    result = dates.copy()
+
+    for frequency, step in DAY_STEPS.items():
+        items = frequencies == frequency
+        result[items] = dates[items] + steps[items] * step
+
+    for frequency, step in MONTH_STEPS.items():
+        items = np.flatnonzero(frequencies == frequency)
+        if items.size == 0:
+            continue
+        grid = _month_grid(dates[items], step, int(steps[items].max()) + 1)
+        result[items] = grid[np.arange(items.size), steps[items]]
+
+    return result
+
+
+def expand_occurrences(next_dates, frequencies, start, end):
+    """
+    Occurrence dates of many recurring items within [start, end]
+    next_dates: datetime64[D] array, frequencies: array of frequency names
+    Returns (item_index, dates) - parallel arrays, one entry per occurrence
+    """
+    next_dates = np.asarray(next_dates, dtype='datetime64[D]')
+    frequencies = np.asarray(frequencies)
+    start = np.datetime64(start, 'D')
+    end = np.datetime64(end, 'D')
+
+    indexes = []
+    dates = []
+
+    for frequency, step in DAY_STEPS.items():
+        items = np.flatnonzero(frequencies == frequency)
+        if items.size == 0:
+            continue
+        span = max(int((end - next_dates[items].min()).astype(int)), 0)
+        steps = np.arange(span // step + 1) * step
+        grid = next_dates[items, None] + steps
+        indexes.append(np.broadcast_to(items[:, None], grid.shape))
+        dates.append(grid)
+
+    for frequency, step in MONTH_STEPS.items():
+        items = np.flatnonzero(frequencies == frequency)
+        if items.size == 0:
+            continue
+        first = next_dates[items]
+        span = max(int((end.astype('datetime64[M]') - first.astype('datetime64[M]').min()).astype(int)), 0)
+        grid = _month_grid(first, step, span // step + 1)
+        indexes.append(np.broadcast_to(items[:, None], grid.shape))
+        dates.append(grid)
+
+    # calculate_next_date leaves unknown frequencies on the same date: a single occurrence
+    other = np.flatnonzero(~np.isin(frequencies, list(DAY_STEPS) + list(MONTH_STEPS)))
+    if other.size:
+        indexes.append(other[:, None])
+        dates.append(next_dates[other, None])
+
+    if not dates:
+        return np.array([], dtype=int), np.array([], dtype='datetime64[D]')
+
+    item_index = np.concatenate([index.ravel() for index in indexes])
+    occurrence = np.concatenate([grid.ravel() for grid in dates])
+    keep = (occurrence >= start) & (occurrence <= end)
+    order = np.argsort(occurrence[keep], kind='stable')
+    return item_index[keep][order], occurrence[keep][order]
+
+
+def _active_items(couple_id):
+    query = """
+    SELECT id, category_name, amount, frequency, next_date, description, status
+    FROM recurring_transactions
+    WHERE couple_id = ? AND status = 'Active'
+    ORDER BY next_date ASC
+    """
+    return fetch_all(query, (couple_id,))
+
+
+def project_recurring(couple_id, months=12, start=None):
+    """
+    Forecast of a couple's active recurring items from start (today) over N months
+    Returns a dict of arrays:
+      days / daily       - every date in the horizon and the amount due that day
+      months / monthly   - every month in the horizon and its total
+      item_ids / dates / amounts - one entry per occurrence
+    """
+    start = np.datetime64(start or date.today(), 'D')
+    first_month = start.astype('datetime64[M]')
+    end = (first_month + months).astype('datetime64[D]') - 1
+
+    items = _active_items(couple_id)
+    ids = np.array([item['id'] for item in items], dtype=int)
+    amounts = np.array([item['amount'] for item in items], dtype=float)
+    item_index, dates = expand_occurrences(
+        np.array([item['next_date'] for item in items], dtype='datetime64[D]'),
+        np.array([item['frequency'] for item in items], dtype=object),
+        start, end
+    )
+    occurrence_amounts = amounts[item_index]
+
+    days = np.arange(start, end + 1, dtype='datetime64[D]')
+    daily = np.bincount((dates - start).astype(int), weights=occurrence_amounts, minlength=len(days))
+
+    month_axis = first_month + np.arange(months)
+    monthly = np.bincount((dates.astype('datetime64[M]') - first_month).astype(int), weights=occurrence_amounts, minlength=months)
+
+    return {
+        'days': days,
+        'daily': daily,
+        'months': month_axis,
+        'monthly': monthly,
+        'item_ids': ids[item_index],
+        'dates': dates,
+        'amounts': occurrence_amounts,
+    }
+
+
+def upcoming_occurrences(couple_id, days_ahead=30, start=None):
+    """Every occurrence of the active recurring items in the next N days, as row dicts sorted by date"""
+    start = np.datetime64(start or date.today(), 'D')
+    items = _active_items(couple_id)
+    item_index, dates = expand_occurrences(
+        np.array([item['next_date'] for item in items], dtype='datetime64[D]'),
+        np.array([item['frequency'] for item in items], dtype=object),
+        start, start + days_ahead
+    )
+    return [dict(items[index], next_date=str(due)) for index, due in zip(item_index, dates)]
@@ -0,0 +1,96 @@
+"""
+Shared cache for dashboard read queries
+Streamlit reruns main.py on every widget interaction, so the same month
+totals, budgets and subscriptions get asked for again and again. Results are
+kept per (function, couple_id, args) and tagged with the couple's generation;
+every write bumps the generation once it commits, which makes the old entries
+unreachable. Entries also expire after QUERY_CACHE_TTL seconds (writes from
+other processes) and the least recently used ones are evicted past
+QUERY_CACHE_SIZE.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from config import QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+from db_connection import in_transaction, on_commit
+
+_entries = OrderedDict()
+_generations = {}
+_global_generation = 0
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+
+def _bump(couple_id):
+    global _global_generation
+    with _lock:
+        if couple_id is None:
+            _global_generation += 1
+        else:
+            _generations[couple_id] = _generations.get(couple_id, 0) + 1
+        _stats['invalidations'] += 1
+
+
+def invalidate_queries(couple_id=None):
+    """
+    Mark a couple's cached results (or everyone's) as stale
+    Inside transaction() this waits for the commit, so a concurrent reader
+    can't re-cache the pre-write data under the new generation.
+    """
+    on_commit(lambda: _bump(couple_id))
+
+
+def cached_query(func):
+    """Cache a read function whose first argument is the couple_id"""
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @wraps(func)
+    def wrapper(couple_id, *args, **kwargs):
+        # Inside transaction() the caller must see its own uncommitted writes
+        if QUERY_CACHE_SIZE <= 0 or in_transaction():
+            return func(couple_id, *args, **kwargs)
+
+        key = (name, couple_id, args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+
+        with _lock:
+            generation = (_global_generation, _generations.get(couple_id, 0))
+            entry = _entries.get(key)
+            if entry is not None and entry[0] == generation and entry[1] > now:
+                _entries.move_to_end(key)
+                _stats['hits'] += 1
+                return entry[2]
+            _stats['misses'] += 1
+
+        result = func(couple_id, *args, **kwargs)
+
+        with _lock:
+            _entries[key] = (generation, now + QUERY_CACHE_TTL, result)
+            _entries.move_to_end(key)
+            while len(_entries) > QUERY_CACHE_SIZE:
+                _entries.popitem(last=False)
+                _stats['evictions'] += 1
+
+        return result
+
+    wrapper.uncached = func
+    return wrapper
+
+
+def clear_query_cache():
+    """Drop every cached result and reset the counters"""
+    with _lock:
+        _entries.clear()
+        for key in _stats:
+            _stats[key] = 0
+
+
+def get_cache_stats():
+    """Hit/miss counters plus current size"""
+    with _lock:
+        stats = dict(_stats)
+        stats['size'] = len(_entries)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
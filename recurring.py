@@ -1,5 +1,8 @@
-from db_connection import execute_query, fetch_all, fetch_one
-from datetime import datetime, timedelta
+from db_connection import execute_query, fetch_all, fetch_one, transaction
+from query_cache import cached_query, invalidate_queries
+from projections import DAY_STEPS, MONTH_STEPS, OCCURRENCES_PER_YEAR, upcoming_occurrences
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 import calendar
 
 
@@ -12,12 +15,14 @@ def save_recurring_transaction(couple_id, category, amount, frequency, next_date
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """
         execute_query(query, (couple_id, category, amount, frequency, next_date, description, status, datetime.now().strftime('%Y-%m-%d')))
+        invalidate_queries(couple_id)
         return True, "✅ Recurring transaction added!"
     except Exception as e:
         return False, f"❌ Error: {str(e)}"
 
 
 
+@cached_query
 def get_recurring_transactions(user_or_couple_id):
     """Get all recurring transactions for a user or couple"""
     try:
@@ -34,11 +39,18 @@ def get_recurring_transactions(user_or_couple_id):
         return []
 
 
+def _invalidate_recurring_owner(recurring_id):
+    """Drop the cached queries of the couple owning a recurring item"""
+    owner = fetch_one("SELECT couple_id FROM recurring_transactions WHERE id = ?", (recurring_id,))
+    invalidate_queries(owner['couple_id'] if owner else None)
+
+
 def update_recurring_status(recurring_id, status):
     """Update recurring transaction status (Active/Paused/Cancelled)"""
     try:
         query = "UPDATE recurring_transactions SET status = ? WHERE id = ?"
         execute_query(query, (status, recurring_id))
+        _invalidate_recurring_owner(recurring_id)
         return True, f"Status updated to {status}"
     except Exception as e:
         return False, f"Error: {str(e)}"
@@ -48,50 +60,73 @@ def update_recurring_status(recurring_id, status):
 def delete_recurring_transaction(recurring_id):
     """Delete a recurring transaction"""
     try:
-        query = "DELETE FROM recurring_transactions WHERE id = ?"
-        execute_query(query, (recurring_id,))
+        # The owner is looked up before the row goes; the cache is invalidated once the delete commits
+        with transaction():
+            _invalidate_recurring_owner(recurring_id)
+            query = "DELETE FROM recurring_transactions WHERE id = ?"
+            execute_query(query, (recurring_id,))
         return True, "Recurring transaction deleted"
     except Exception as e:
         return False, f"Error: {str(e)}"
 
 
 
-def process_due_recurring_transactions(couple_id):
-    """Automatically create transactions for due recurring items"""
+def due_occurrences(next_date, frequency, today):
+    """
+    Every occurrence from next_date up to and including today
+    Returns (dates, new_next_date) - the first date after today becomes the new next_date
+    """
+    dates = []
+    current = next_date
+    while current <= today:
+        dates.append(current)
+        following = calculate_next_date(current, frequency)
+        if following <= current:
+            # Unknown frequency or bad date: post once, don't loop forever
+            return dates, following
+        current = following
+    return dates, current
+
+
+def process_due_recurring_transactions(couple_id, today=None):
+    """
+    Post every missed occurrence of a couple's active recurring items
+    Each item's next_date is moved on with a compare-and-set UPDATE, and only the
+    occurrences of items whose UPDATE matched are posted, all in one transaction,
+    so a second run (or a concurrent one) posts nothing twice. Postings name their
+    item ([RECURRING #id]): two items with the same category, amount and date
+    each get their own.
+    Returns the number of transactions created.
+    """
     try:
-        today = datetime.now().strftime('%Y-%m-%d')
-        
-        # Get all active recurring transactions that are due
-        query = """
-        SELECT id, category_name, amount, frequency, next_date
-        FROM recurring_transactions
-        WHERE couple_id = ? AND status = 'Active' AND next_date <= ?
-        """
-        due_items = fetch_all(query, (couple_id, today))
-        
-        created_count = 0
-        
-        for item in due_items:
-            # Create actual transaction
-            from transactions import save_transaction
-            success, _ = save_transaction(
-                user_id=couple_id,  # Use couple_id as user for tracking
-                couple_id=couple_id,
-                amount=item['amount'],
-                category=item['category_name'],
-                description=f"[RECURRING] {item['category_name']}",
-                trans_date=today,
-                trans_type='Expense'
-            )
+        today = today or datetime.now().strftime('%Y-%m-%d')
+        from transactions import save_transactions_bulk
+        
+        with transaction():
+            # Get all active recurring transactions that are due
+            query = """
+            SELECT id, category_name, amount, frequency, next_date
+            FROM recurring_transactions
+            WHERE couple_id = ? AND status = 'Active' AND next_date <= ?
+            """
+            due_items = fetch_all(query, (couple_id, today))
+            if not due_items:
+                return 0
+            
+            rows = []
+            for item in due_items:
+                dates, next_date = due_occurrences(item['next_date'], item['frequency'], today)
+                # Only the run that advances next_date from the date we read posts these occurrences
+                query = "UPDATE recurring_transactions SET next_date = ? WHERE id = ? AND next_date = ?"
+                if execute_query(query, (next_date, item['id'], item['next_date'])).rowcount != 1:
+                    continue
+                rows.extend(
+                    (item['amount'], item['category_name'], f"[RECURRING #{item['id']}] {item['category_name']}", trans_date, 'Expense')
+                    for trans_date in dates
+                )
             
-            if success:
-                created_count += 1
-                # Calculate next date
-                next_date = calculate_next_date(item['next_date'], item['frequency'])
-                
-                # Update recurring transaction with next date
-                query = "UPDATE recurring_transactions SET next_date = ? WHERE id = ?"
-                execute_query(query, (next_date, item['id']))
+            created_count, _ = save_transactions_bulk(couple_id, couple_id, rows)  # couple_id as user for tracking
+            invalidate_queries(couple_id)
         
         return created_count
     except Exception as e:
@@ -100,72 +135,45 @@ def process_due_recurring_transactions(couple_id):
 
 
 
+def _parse_date(value):
+    """'YYYY-MM-DD' string (or date) -> date"""
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+
+@lru_cache(maxsize=4096)
 def calculate_next_date(current_date, frequency):
     """
     Calculate next due date based on frequency
     FIXES: Handles month-end dates properly (Jan 31 -> Feb 28/29, not Feb 31)
+    Steps come from projections.DAY_STEPS / MONTH_STEPS (Yearly = 12 months, so
+    Feb 29 -> Feb 28). Memoized: catch-up posting and forecasts call it in loops.
+    For many dates at once use projections.advance_dates.
     """
     try:
-        current = datetime.strptime(current_date, '%Y-%m-%d')
+        current = _parse_date(current_date)
         
-        if frequency == 'Weekly':
-            next_date = current + timedelta(days=7)
+        if frequency in DAY_STEPS:
+            next_date = current + timedelta(days=DAY_STEPS[frequency])
         
-        elif frequency == 'Bi-weekly':
-            next_date = current + timedelta(days=14)
-        
-        elif frequency == 'Monthly':
-            # Handle month-end dates properly
-            year = current.year
-            month = current.month
-            day = current.day
-            
-            # Move to next month
-            if month == 12:
-                year += 1
-                month = 1
-            else:
-                month += 1
+        elif frequency in MONTH_STEPS:
+            months = current.month - 1 + MONTH_STEPS[frequency]
+            year = current.year + months // 12
+            month = months % 12 + 1
             
-            # Get the last day of the target month
-            last_day_of_month = calendar.monthrange(year, month)[1]
-            
-            # If original day is beyond last day of next month, use last day
-            if day > last_day_of_month:
-                day = last_day_of_month
-            
-            next_date = current.replace(year=year, month=month, day=day)
-        
-        elif frequency == 'Quarterly':
-            # Add 3 months properly
-            year = current.year
-            month = current.month + 3
-            day = current.day
-            
-            # Handle year rollover
-            if month > 12:
-                year += 1
-                month -= 12
-            
-            # Handle month-end dates in quarterly
-            last_day_of_month = calendar.monthrange(year, month)[1]
-            if day > last_day_of_month:
-                day = last_day_of_month
-            
-            next_date = current.replace(year=year, month=month, day=day)
-        
-        elif frequency == 'Yearly':
-            # Handle leap year for Feb 29
-            try:
-                next_date = current.replace(year=current.year + 1)
-            except ValueError:
-                # If Feb 29 and next year isn't leap year, use Feb 28
-                next_date = current.replace(year=current.year + 1, day=28)
+            # If original day is beyond last day of the target month, use last day
+            day = min(current.day, calendar.monthrange(year, month)[1])
+            next_date = date(year, month, day)
         
         else:
             next_date = current
         
-        return next_date.strftime('%Y-%m-%d')
+        return next_date.isoformat()
     
     except Exception as e:
         print(f"Error calculating next date: {str(e)}")
@@ -174,55 +182,27 @@ def calculate_next_date(current_date, frequency):
 
 
 def get_upcoming_subscriptions(couple_id, days_ahead=30):
-    """Get subscriptions due in next N days"""
+    """Get subscription payments due in next N days (every occurrence, not just the next one)"""
     try:
-        today = datetime.now().strftime('%Y-%m-%d')
-        future = (datetime.now() + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
-        
-        query = """
-        SELECT id, category_name, amount, frequency, next_date, description, status
-        FROM recurring_transactions
-        WHERE couple_id = ? AND status = 'Active' AND next_date BETWEEN ? AND ?
-        ORDER BY next_date ASC
-        """
-        results = fetch_all(query, (couple_id, today, future))
-        return results
+        return upcoming_occurrences(couple_id, days_ahead)
     except Exception as e:
         print(f"Error: {str(e)}")
         return []
 
 
 
+@cached_query
 def get_monthly_subscription_cost(couple_id):
-    """Calculate total monthly subscription cost"""
+    """Calculate total monthly subscription cost (average month: occurrences per year / 12)"""
     try:
-        query = """
-        SELECT SUM(amount) as total
+        cases = " ".join(f"WHEN '{frequency}' THEN {per_year!r}" for frequency, per_year in OCCURRENCES_PER_YEAR.items())
+        query = f"""
+        SELECT TOTAL(amount * CASE frequency {cases} ELSE 0 END) / 12 as total
         FROM recurring_transactions
         WHERE couple_id = ? AND status = 'Active'
-        AND frequency IN ('Monthly', 'Weekly', 'Bi-weekly')
         """
         result = fetch_one(query, (couple_id,))
-        
-        # Calculate monthly equivalent
-        monthly_total = 0
-        
-        query2 = "SELECT amount, frequency FROM recurring_transactions WHERE couple_id = ? AND status = 'Active'"
-        items = fetch_all(query2, (couple_id,))
-        
-        for item in items:
-            if item['frequency'] == 'Weekly':
-                monthly_total += item['amount'] * 4.33  # Average weeks per month
-            elif item['frequency'] == 'Bi-weekly':
-                monthly_total += item['amount'] * 2.17  # Average bi-weeks per month
-            elif item['frequency'] == 'Monthly':
-                monthly_total += item['amount']
-            elif item['frequency'] == 'Quarterly':
-                monthly_total += (item['amount'] / 3)  # Quarterly divided by 3 months
-            elif item['frequency'] == 'Yearly':
-                monthly_total += (item['amount'] / 12)  # Yearly divided by 12 months
-        
-        return monthly_total
+        return result['total'] if result else 0
     except Exception as e:
         print(f"Error: {str(e)}")
         return 0
@@ -0,0 +1,233 @@
+"""
+Report artifact store
+Rendered xlsx/pdf reports are saved under REPORT_CACHE_DIR, named by
+(couple_id, period, format) plus a digest of the month's data. A repeated
+download re-checks the digest (a few indexed queries) and serves the saved
+file; only a change to the month's transactions, budgets or subscriptions
+renders a new one. Missing reports a user asks for render on their own
+thread; last month's reports can be prebuilt in the background
+(REPORT_WORKERS threads).
+Files unused for REPORT_CACHE_MAX_AGE_DAYS are deleted, as are the least
+recently used ones once the store passes REPORT_CACHE_MAX_MB; deleting a
+couple deletes all of its files.
+"""
+import hashlib
+import os
+import threading
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from config import REPORT_CACHE_DIR, REPORT_CACHE_MAX_AGE_DAYS, REPORT_CACHE_MAX_MB, REPORT_WORKERS
+from db_connection import fetch_all, fetch_one
+from periods import month_filter, month_key
+from reports import export_to_excel, export_to_pdf
+
+# format -> (exporter, file extension)
+REPORT_FORMATS = {
+    'xlsx': (export_to_excel, 'xlsx'),
+    'pdf': (export_to_pdf, 'pdf'),
+    'summary_pdf': (partial(export_to_pdf, summary_only=True), 'pdf'),
+}
+
+_executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix='report-builder')
+_building = {}
+_purges = {}  # couple_id -> times its reports were purged, so a build finishing afterwards isn't kept
+_lock = threading.Lock()
+_stats = {'hits': 0, 'builds': 0, 'failures': 0, 'pruned': 0}
+
+
+def report_digest(couple_id, month, year):
+    """Digest of everything a month's report is built from"""
+    date_clause, date_params = month_filter('transaction_date', month, year)
+    # Fingerprints change whenever a transaction is edited, ids when rows come and go
+    transactions = fetch_one(f"""
+        SELECT COUNT(*) AS count, TOTAL(amount) AS total,
+               group_concat(id || ':' || COALESCE(fingerprint, ''), ',') AS rows
+        FROM transactions
+        WHERE couple_id = ? AND {date_clause}
+        """, (couple_id, *date_params))
+    budgets = fetch_all(
+        "SELECT category_id, planned_amount FROM budgets WHERE couple_id = ? AND month_year = ? ORDER BY category_id",
+        (couple_id, month_key(month, year))
+    )
+    subscriptions = fetch_all(
+        "SELECT id, category_name, amount, frequency, next_date FROM recurring_transactions WHERE couple_id = ? AND status = 'Active' ORDER BY id",
+        (couple_id,)
+    )
+
+    digest = hashlib.sha256()
+    digest.update(repr(tuple(transactions) if transactions else ()).encode('utf-8'))
+    digest.update(repr([tuple(row) for row in budgets]).encode('utf-8'))
+    digest.update(repr([tuple(row) for row in subscriptions]).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _artifact_path(couple_id, month, year, file_format, digest):
+    extension = REPORT_FORMATS[file_format][1]
+    return os.path.join(REPORT_CACHE_DIR, f"{couple_id}_{month_key(month, year)}_{file_format}_{digest}.{extension}")
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+
+def prune_report_store():
+    """Delete files unused for REPORT_CACHE_MAX_AGE_DAYS, then the least recently used past REPORT_CACHE_MAX_MB"""
+    try:
+        names = os.listdir(REPORT_CACHE_DIR)
+    except OSError:
+        return 0
+
+    files = []
+    for name in names:
+        path = os.path.join(REPORT_CACHE_DIR, name)
+        try:
+            info = os.stat(path)
+        except OSError:
+            continue
+        files.append((info.st_mtime, info.st_size, path))
+
+    files.sort()
+    expires = time.time() - REPORT_CACHE_MAX_AGE_DAYS * 86400
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for modified, size, path in files:
+        if modified >= expires and total <= REPORT_CACHE_MAX_MB * 1024 * 1024:
+            break
+        if _remove(path):
+            removed += 1
+        total -= size
+
+    with _lock:
+        _stats['pruned'] += removed
+    return removed
+
+
+def purge_couple_reports(couple_id):
+    """Delete every stored report of a couple and drop its pending builds"""
+    prefix = f"{couple_id}_"
+    with _lock:
+        _purges[couple_id] = _purges.get(couple_id, 0) + 1
+        for path, future in list(_building.items()):
+            if os.path.basename(path).startswith(prefix):
+                future.cancel()
+                _building.pop(path, None)
+
+    try:
+        names = os.listdir(REPORT_CACHE_DIR)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(prefix):
+            _remove(os.path.join(REPORT_CACHE_DIR, name))
+
+
+def _build(couple_id, month, year, file_format, path, generation):
+    """Render a report and save it under its content-addressed name"""
+    output = REPORT_FORMATS[file_format][0](couple_id, month, year)
+    if output is None:
+        with _lock:
+            _stats['failures'] += 1
+        return None
+
+    data = output.getvalue()
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+    with _lock:
+        purged = _purges.get(couple_id, 0) != generation
+    if purged:
+        # The couple was deleted while this was rendering
+        _remove(path)
+        return None
+
+    # Older versions of the same report are stale now
+    prefix = os.path.basename(path).rsplit('_', 1)[0] + '_'
+    for name in os.listdir(REPORT_CACHE_DIR):
+        if name.startswith(prefix) and name != os.path.basename(path) and not name.endswith('.tmp'):
+            _remove(os.path.join(REPORT_CACHE_DIR, name))
+
+    with _lock:
+        _stats['builds'] += 1
+    prune_report_store()
+    return data
+
+
+def _submit(couple_id, month, year, file_format, path):
+    """Future building the report at path (joins a build already in progress)"""
+    with _lock:
+        future = _building.get(path)
+        if future is not None:
+            return future
+
+        future = _executor.submit(_build, couple_id, month, year, file_format, path, _purges.get(couple_id, 0))
+        _building[path] = future
+
+    future.add_done_callback(lambda _: _forget(path))
+    return future
+
+
+def _forget(path):
+    with _lock:
+        _building.pop(path, None)
+
+
+def get_report(couple_id, month, year, file_format):
+    """Report file as BytesIO (served from the store when the month's data hasn't changed), None on failure"""
+    if file_format not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format '{file_format}'")
+
+    path = _artifact_path(couple_id, month, year, file_format, report_digest(couple_id, month, year))
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        # The modification time doubles as "last used" for pruning
+        os.utime(path)
+        with _lock:
+            _stats['hits'] += 1
+        return BytesIO(data)
+    except OSError:
+        pass
+
+    # Render on the caller's thread; the pool is for prebuilds and a click mustn't queue behind them.
+    # A prebuild of this very file that has already started is joined instead.
+    with _lock:
+        future = _building.get(path)
+        generation = _purges.get(couple_id, 0)
+    if future is not None and not future.cancel():
+        data = future.result()
+    else:
+        data = _build(couple_id, month, year, file_format, path, generation)
+    return BytesIO(data) if data is not None else None
+
+
+def prebuild_reports(couple_id, month=None, year=None, formats=('xlsx', 'pdf')):
+    """Queue background builds of a month's reports (last month by default) that aren't stored yet"""
+    if not month or not year:
+        now = datetime.now()
+        month, year = (12, now.year - 1) if now.month == 1 else (now.month - 1, now.year)
+
+    digest = report_digest(couple_id, month, year)
+    futures = []
+    for file_format in formats:
+        path = _artifact_path(couple_id, month, year, file_format, digest)
+        if not os.path.exists(path):
+            futures.append(_submit(couple_id, month, year, file_format, path))
+    return futures
+
+
+def get_report_stats():
+    """Store hit/build counters"""
+    with _lock:
+        stats = dict(_stats)
+        stats['building'] = len(_building)
+    return stats
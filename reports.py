@@ -1,7 +1,17 @@
+import csv
+import io
+import json
+import sys
+import zlib
+import time
+import argparse
+import numpy as np
 import pandas as pd
 from io import BytesIO
 from datetime import datetime
-from db_connection import fetch_all, fetch_one
+from config import DEBUG
+from db_connection import fetch_all, pooled_connection
+from periods import date_range_filter, month_filter, month_key, month_keys
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
@@ -9,31 +19,40 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT
 
+# Rows fetched per round trip by the streaming export
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_COLUMNS = ['id', 'transaction_date', 'category_name', 'description', 'amount', 'transaction_type', 'user_id']
+
+# The month's budgets with actual spend from the monthly rollup, in one query
+_BUDGET_VS_ACTUAL_SQL = """
+SELECT b.id, b.category_id, COALESCE(c.category_name, '') AS category_name, b.planned_amount,
+       COALESCE(m.total, 0) AS actual
+FROM budgets b
+LEFT JOIN categories c ON b.category_id = c.id
+LEFT JOIN monthly_category_totals m ON m.couple_id = b.couple_id AND m.month = b.month_year
+    AND m.category_id = b.category_id AND m.transaction_type = 'Expense'
+WHERE b.couple_id = ? AND b.month_year = ?
+ORDER BY c.category_name
+"""
+
 
 def generate_monthly_report(couple_id, month, year):
     """Generate a comprehensive monthly report for a couple"""
     try:
         # Get all transactions for the month
-        query = """
+        date_clause, date_params = month_filter('t.transaction_date', month, year)
+        query = f"""
         SELECT t.id, t.transaction_date, t.category_id, t.description, t.amount, t.transaction_type, c.category_name
         FROM transactions t
         LEFT JOIN categories c ON t.category_id = c.id
         WHERE t.couple_id = ? 
-        AND strftime('%m', t.transaction_date) = ? 
-        AND strftime('%Y', t.transaction_date) = ?
+        AND {date_clause}
         ORDER BY t.transaction_date DESC
         """
-        transactions = fetch_all(query, (couple_id, f"{month:02d}", str(year)))
+        transactions = fetch_all(query, (couple_id, *date_params))
         
-        # Get budget data for the month
-        query2 = """
-        SELECT b.id, b.category_id, b.planned_amount, c.category_name
-        FROM budgets b
-        LEFT JOIN categories c ON b.category_id = c.id
-        WHERE b.couple_id = ?
-        ORDER BY c.category_name
-        """
-        budgets = fetch_all(query2, (couple_id,))
+        # Get budget data (with actual spend) for the month
+        budgets = fetch_all(_BUDGET_VS_ACTUAL_SQL, (couple_id, month_key(month, year)))
         
         # Get subscriptions
         query3 = """
@@ -55,13 +74,97 @@ def generate_monthly_report(couple_id, month, year):
         return None
 
 
+def _read_frame(query, params, dtypes):
+    """Run a query into a DataFrame with fixed column types"""
+    with pooled_connection() as conn:
+        df = pd.read_sql(query, conn, params=params)
+    return df.astype(dtypes)
+
+
+def _read_transactions(couple_id, date_clause, date_params):
+    """Transactions matching a date predicate as one typed DataFrame, newest first"""
+    return _read_frame(f"""
+        SELECT t.transaction_date, t.category_id, COALESCE(c.category_name, '') AS category_name,
+               COALESCE(t.description, '') AS description, t.amount, t.transaction_type
+        FROM transactions t
+        LEFT JOIN categories c ON t.category_id = c.id
+        WHERE t.couple_id = ?
+        AND {date_clause}
+        ORDER BY t.transaction_date DESC
+        """,
+        (couple_id, *date_params),
+        {'transaction_date': 'string', 'category_id': 'int64', 'category_name': 'string',
+         'description': 'string', 'amount': 'float64', 'transaction_type': 'category'}
+    )
+
+
+def _read_subscriptions(couple_id):
+    """Active subscriptions as a typed DataFrame"""
+    return _read_frame("""
+        SELECT category_name, amount, frequency, next_date, status FROM recurring_transactions
+        WHERE couple_id = ? AND status = 'Active'
+        ORDER BY next_date ASC
+        """,
+        (couple_id,),
+        {'category_name': 'string', 'amount': 'float64', 'frequency': 'string', 'next_date': 'string', 'status': 'string'}
+    )
+
+
+def _totals(transactions):
+    """Income, expenses and net of a transactions frame"""
+    by_type = transactions.groupby('transaction_type', observed=False)['amount'].sum()
+    income = float(by_type.get('Income', 0.0))
+    expenses = float(by_type.get('Expense', 0.0))
+    return {'income': income, 'expenses': expenses, 'net': income - expenses}
+
+
+def build_report(couple_id, month, year):
+    """
+    Report core shared by the exporters
+    Loads the month's transactions into one typed DataFrame and derives totals
+    and per-category groups with vectorized groupby; budget vs actual comes
+    from one query over the monthly rollup.
+    Returns a dict: transactions, totals, categories, budgets, subscriptions
+    """
+    transactions = _read_transactions(couple_id, *month_filter('t.transaction_date', month, year))
+    
+    budgets = _read_frame(
+        _BUDGET_VS_ACTUAL_SQL,
+        (couple_id, month_key(month, year)),
+        {'id': 'int64', 'category_id': 'int64', 'category_name': 'string', 'planned_amount': 'float64', 'actual': 'float64'}
+    )
+    
+    subscriptions = _read_subscriptions(couple_id)
+    
+    categories = (
+        transactions.groupby(['category_name', 'transaction_type'], observed=True)['amount']
+        .agg(total='sum', count='count')
+        .reset_index()
+    )
+    
+    budgets['remaining'] = budgets['planned_amount'] - budgets['actual']
+    budgets['on_track'] = budgets['actual'] <= budgets['planned_amount']
+    
+    return {
+        'period': datetime(year, month, 1).strftime('%B %Y'),
+        'transactions': transactions,
+        'totals': _totals(transactions),
+        'categories': categories,
+        'budgets': budgets,
+        'subscriptions': subscriptions
+    }
+
+
+def _money(series, prefix='R'):
+    """Format an amount column for display (vectorized)"""
+    return prefix + series.round(2).map('{:.2f}'.format)
+
+
 def export_to_excel(couple_id, month, year):
     """Export monthly report to Excel file"""
     try:
-        report_data = generate_monthly_report(couple_id, month, year)
-        
-        if not report_data:
-            return None
+        report = build_report(couple_id, month, year)
+        transactions = report['transactions']
         
         # Create Excel file in memory
         output = BytesIO()
@@ -69,89 +172,56 @@ def export_to_excel(couple_id, month, year):
         with pd.ExcelWriter(output, engine='openpyxl') as writer:
             # Sheet 1: Summary
             summary_data = {
-                'Report Period': [f"{datetime(year, month, 1).strftime('%B %Y')}"],
+                'Report Period': [report['period']],
                 'Generated Date': [datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
-                'Total Transactions': [len(report_data['transactions'])],
-                'Total Subscriptions': [len(report_data['subscriptions'])]
+                'Total Transactions': [len(transactions)],
+                'Total Subscriptions': [len(report['subscriptions'])]
             }
             df_summary = pd.DataFrame(summary_data)
             df_summary.to_excel(writer, sheet_name='Summary', index=False)
             
             # Sheet 2: Transactions
-            if report_data['transactions']:
-                trans_list = []
-                for t in report_data['transactions']:
-                    t_dict = dict(t) if not isinstance(t, dict) else t
-                    
-                    trans_list.append({
-                        'Date': t_dict.get('transaction_date', ''),
-                        'Category': t_dict.get('category_name', ''),
-                        'Description': t_dict.get('description', '') or '',
-                        'Amount (R)': f"{float(t_dict.get('amount', 0)):.2f}",
-                        'Type': t_dict.get('transaction_type', '')
-                    })
-                
-                df_trans = pd.DataFrame(trans_list)
+            if not transactions.empty:
+                df_trans = pd.DataFrame({
+                    'Date': transactions['transaction_date'],
+                    'Category': transactions['category_name'],
+                    'Description': transactions['description'],
+                    'Amount (R)': transactions['amount'].round(2),
+                    'Type': transactions['transaction_type']
+                })
                 df_trans.to_excel(writer, sheet_name='Transactions', index=False)
                 
                 # Add summary stats
-                income = sum(float(t['Amount (R)']) for t in trans_list if t['Type'] == 'Income')
-                expenses = sum(float(t['Amount (R)']) for t in trans_list if t['Type'] == 'Expense')
-                net = income - expenses
-                
+                totals = report['totals']
                 stats_data = {
                     'Metric': ['Total Income', 'Total Expenses', 'Net'],
-                    'Amount (R)': [f"{income:.2f}", f"{expenses:.2f}", f"{net:.2f}"]
+                    'Amount (R)': [round(totals['income'], 2), round(totals['expenses'], 2), round(totals['net'], 2)]
                 }
                 df_stats = pd.DataFrame(stats_data)
-                df_stats.to_excel(writer, sheet_name='Transactions', startrow=len(trans_list) + 3, index=False)
+                df_stats.to_excel(writer, sheet_name='Transactions', startrow=len(df_trans) + 3, index=False)
             
             # Sheet 3: Budget vs Actual
-            if report_data['budgets']:
-                budget_rows = []
-                for budget in report_data['budgets']:
-                    b_dict = dict(budget) if not isinstance(budget, dict) else budget
-                    
-                    actual_query = """
-                    SELECT SUM(amount) as total
-                    FROM transactions
-                    WHERE couple_id = ? AND category_id = ?
-                    AND strftime('%m', transaction_date) = ?
-                    AND strftime('%Y', transaction_date) = ?
-                    AND transaction_type = 'Expense'
-                    """
-                    result = fetch_one(actual_query, (couple_id, b_dict['category_id'], f"{month:02d}", str(year)))
-                    result_dict = dict(result) if result else {}
-                    actual = float(result_dict.get('total', 0)) if result_dict.get('total') else 0.0
-                    budgeted = float(b_dict['planned_amount'])
-                    
-                    budget_rows.append({
-                        'Category': b_dict['category_name'],
-                        'Budgeted (R)': f"{budgeted:.2f}",
-                        'Actual (R)': f"{actual:.2f}",
-                        'Remaining (R)': f"{budgeted - actual:.2f}",
-                        'Status': '✅ On Track' if actual <= budgeted else '⚠️ Over Budget'
-                    })
-                
-                if budget_rows:
-                    df_budget = pd.DataFrame(budget_rows)
-                    df_budget.to_excel(writer, sheet_name='Budget vs Actual', index=False)
+            budgets = report['budgets']
+            if not budgets.empty:
+                df_budget = pd.DataFrame({
+                    'Category': budgets['category_name'],
+                    'Budgeted (R)': budgets['planned_amount'].round(2),
+                    'Actual (R)': budgets['actual'].round(2),
+                    'Remaining (R)': budgets['remaining'].round(2),
+                    'Status': np.where(budgets['on_track'], '✅ On Track', '⚠️ Over Budget')
+                })
+                df_budget.to_excel(writer, sheet_name='Budget vs Actual', index=False)
             
             # Sheet 4: Subscriptions
-            if report_data['subscriptions']:
-                subs_list = []
-                for sub in report_data['subscriptions']:
-                    s_dict = dict(sub) if not isinstance(sub, dict) else sub
-                    
-                    subs_list.append({
-                        'Subscription': s_dict.get('category_name', ''),
-                        'Amount (R)': f"{float(s_dict.get('amount', 0)):.2f}",
-                        'Frequency': s_dict.get('frequency', ''),
-                        'Next Due': s_dict.get('next_date', ''),
-                        'Status': s_dict.get('status', '')
-                    })
-                
-                df_subs = pd.DataFrame(subs_list)
+            subscriptions = report['subscriptions']
+            if not subscriptions.empty:
+                df_subs = pd.DataFrame({
+                    'Subscription': subscriptions['category_name'],
+                    'Amount (R)': subscriptions['amount'].round(2),
+                    'Frequency': subscriptions['frequency'],
+                    'Next Due': subscriptions['next_date'],
+                    'Status': subscriptions['status']
+                })
                 df_subs.to_excel(writer, sheet_name='Subscriptions', index=False)
         
         output.seek(0)
@@ -164,190 +234,174 @@ def export_to_excel(couple_id, month, year):
         return None
 
 
-def export_to_pdf(couple_id, month, year):
-    """Export monthly report to PDF file"""
+def _table_style(header_font_size, body_font_size=None, body_background=colors.lightgrey):
+    """Blue header row, gridded body"""
+    commands = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E5090')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_font_size),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), header_font_size),
+        ('BACKGROUND', (0, 1), (-1, -1), body_background),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]
+    if body_font_size:
+        commands.append(('FONTSIZE', (0, 1), (-1, -1), body_font_size))
+    return TableStyle(commands)
+
+
+# PDF styles are built once at import instead of on every export
+_STYLES = getSampleStyleSheet()
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_STYLES['Heading1'],
+    fontSize=24,
+    textColor=colors.HexColor('#2E5090'),
+    spaceAfter=30,
+    alignment=TA_CENTER
+)
+HEADING_STYLE = ParagraphStyle(
+    'CustomHeading',
+    parent=_STYLES['Heading2'],
+    fontSize=14,
+    textColor=colors.HexColor('#2E5090'),
+    spaceAfter=12,
+    spaceBefore=12
+)
+SUMMARY_TABLE_STYLE = _table_style(12, body_background=colors.beige)
+TRANSACTION_TABLE_STYLE = _table_style(10, 8)
+DETAIL_TABLE_STYLE = _table_style(10, 9)
+TREND_TABLE_STYLE = _table_style(8, 8)
+
+# Rows per reportlab Table; one giant table is slow to lay out and split across pages
+PDF_TABLE_CHUNK_ROWS = 500
+
+
+def _add_table(elements, rows, col_widths=None, style=DETAIL_TABLE_STYLE, chunk_rows=PDF_TABLE_CHUNK_ROWS):
+    """Append rows (header first) as tables of at most chunk_rows rows, each repeating the header"""
+    header, body = rows[0], rows[1:]
+    for start in range(0, max(len(body), 1), chunk_rows):
+        table = Table([header] + body[start:start + chunk_rows], colWidths=col_widths, repeatRows=1)
+        table.setStyle(style)
+        elements.append(table)
+    elements.append(Spacer(1, 0.3*inch))
+
+
+class _SectionTimer:
+    """Collects wall time per report section into a dict"""
+    
+    def __init__(self, timings):
+        self.timings = timings if timings is not None else {}
+        self.started = time.perf_counter()
+    
+    def mark(self, section):
+        now = time.perf_counter()
+        self.timings[section] = self.timings.get(section, 0.0) + now - self.started
+        self.started = now
+    
+    def report(self, label):
+        if DEBUG:
+            print(f"⏱️ {label}: " + ", ".join(f"{name}={seconds:.3f}s" for name, seconds in self.timings.items()))
+
+
+def export_to_pdf(couple_id, month, year, summary_only=False, timings=None):
+    """
+    Export monthly report to PDF file
+    summary_only: leave out the transaction list (totals, categories, budgets and subscriptions only)
+    timings: optional dict filled with seconds spent per section
+    """
     try:
-        report_data = generate_monthly_report(couple_id, month, year)
-        
-        if not report_data:
-            return None
+        timer = _SectionTimer(timings)
+        report = build_report(couple_id, month, year)
+        transactions = report['transactions']
+        timer.mark('query')
         
         output = BytesIO()
         doc = SimpleDocTemplate(output, pagesize=letter)
         elements = []
-        styles = getSampleStyleSheet()
         
         # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#2E5090'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        month_name = datetime(year, month, 1).strftime('%B %Y')
-        elements.append(Paragraph(f"💰 Budget Report - {month_name}", title_style))
+        elements.append(Paragraph(f"💰 Budget Report - {report['period']}", TITLE_STYLE))
         elements.append(Spacer(1, 0.3*inch))
         
         # Summary Section
-        summary_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            textColor=colors.HexColor('#2E5090'),
-            spaceAfter=12,
-            spaceBefore=12
-        )
-        elements.append(Paragraph("Summary", summary_style))
+        elements.append(Paragraph("Summary", HEADING_STYLE))
         
         # Transaction Stats
-        if report_data['transactions']:
-            trans_list = []
-            total_income = 0
-            total_expenses = 0
-            
-            for t in report_data['transactions']:
-                t_dict = dict(t) if not isinstance(t, dict) else t
-                amount = float(t_dict.get('amount', 0))
-                trans_type = t_dict.get('transaction_type', '')
-                
-                if trans_type == 'Income':
-                    total_income += amount
-                else:
-                    total_expenses += amount
-            
-            net = total_income - total_expenses
-            
-            summary_data = [
+        if not transactions.empty:
+            totals = report['totals']
+            _add_table(elements, [
                 ['Metric', 'Amount (R)'],
-                ['Total Income', f"R{total_income:.2f}"],
-                ['Total Expenses', f"R{total_expenses:.2f}"],
-                ['Net', f"R{net:.2f}"]
-            ]
-            
-            summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E5090')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            elements.append(summary_table)
-            elements.append(Spacer(1, 0.3*inch))
+                ['Total Income', f"R{totals['income']:.2f}"],
+                ['Total Expenses', f"R{totals['expenses']:.2f}"],
+                ['Net', f"R{totals['net']:.2f}"]
+            ], [3*inch, 2*inch], SUMMARY_TABLE_STYLE)
+        timer.mark('summary')
         
-        # Transactions Section
-        if report_data['transactions']:
-            elements.append(Paragraph("Transactions", summary_style))
+        # Transactions Section (per-category totals in summary-only mode)
+        if not transactions.empty and summary_only:
+            elements.append(Paragraph("Spending by Category", HEADING_STYLE))
+            categories = report['categories'].sort_values('total', ascending=False)
+            _add_table(elements, [['Category', 'Type', 'Total (R)', 'Transactions']] + pd.DataFrame({
+                'category': categories['category_name'],
+                'type': categories['transaction_type'].astype('string'),
+                'total': _money(categories['total']),
+                'count': categories['count'].astype(str)
+            }).values.tolist(), [1.8*inch, 1*inch, 1.4*inch, 1.2*inch])
+        elif not transactions.empty:
+            elements.append(Paragraph("Transactions", HEADING_STYLE))
             
             trans_rows = [['Date', 'Category', 'Description', 'Amount (R)', 'Type']]
-            for t in report_data['transactions']:
-                t_dict = dict(t) if not isinstance(t, dict) else t
-                trans_rows.append([
-                    t_dict.get('transaction_date', ''),
-                    t_dict.get('category_name', ''),
-                    (t_dict.get('description', '') or '')[:20],  # Truncate long descriptions
-                    f"R{float(t_dict.get('amount', 0)):.2f}",
-                    t_dict.get('transaction_type', '')
-                ])
-            
-            trans_table = Table(trans_rows, colWidths=[1.2*inch, 1.2*inch, 1.2*inch, 1*inch, 0.8*inch])
-            trans_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E5090')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('FONTSIZE', (0, 1), (-1, -1), 8)
-            ]))
-            elements.append(trans_table)
-            elements.append(Spacer(1, 0.3*inch))
+            trans_rows += pd.DataFrame({
+                'date': transactions['transaction_date'],
+                'category': transactions['category_name'],
+                'description': transactions['description'].str.slice(0, 20),  # Truncate long descriptions
+                'amount': _money(transactions['amount']),
+                'type': transactions['transaction_type'].astype('string')
+            }).values.tolist()
+            _add_table(elements, trans_rows, [1.2*inch, 1.2*inch, 1.2*inch, 1*inch, 0.8*inch], TRANSACTION_TABLE_STYLE)
+        timer.mark('transactions')
         
         # Budget vs Actual Section
-        if report_data['budgets']:
+        budgets = report['budgets']
+        if not budgets.empty:
             elements.append(PageBreak())
-            elements.append(Paragraph("Budget vs Actual", summary_style))
+            elements.append(Paragraph("Budget vs Actual", HEADING_STYLE))
             
             budget_rows = [['Category', 'Budgeted (R)', 'Actual (R)', 'Remaining (R)', 'Status']]
-            for budget in report_data['budgets']:
-                b_dict = dict(budget) if not isinstance(budget, dict) else budget
-                
-                actual_query = """
-                SELECT SUM(amount) as total
-                FROM transactions
-                WHERE couple_id = ? AND category_id = ?
-                AND strftime('%m', transaction_date) = ?
-                AND strftime('%Y', transaction_date) = ?
-                AND transaction_type = 'Expense'
-                """
-                result = fetch_one(actual_query, (couple_id, b_dict['category_id'], f"{month:02d}", str(year)))
-                result_dict = dict(result) if result else {}
-                actual = float(result_dict.get('total', 0)) if result_dict.get('total') else 0.0
-                budgeted = float(b_dict['planned_amount'])
-                
-                budget_rows.append([
-                    b_dict['category_name'],
-                    f"R{budgeted:.2f}",
-                    f"R{actual:.2f}",
-                    f"R{budgeted - actual:.2f}",
-                    '✅ On Track' if actual <= budgeted else '⚠️ Over'
-                ])
-            
-            budget_table = Table(budget_rows, colWidths=[1.5*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1*inch])
-            budget_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E5090')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('FONTSIZE', (0, 1), (-1, -1), 9)
-            ]))
-            elements.append(budget_table)
-            elements.append(Spacer(1, 0.3*inch))
+            budget_rows += pd.DataFrame({
+                'category': budgets['category_name'],
+                'budgeted': _money(budgets['planned_amount']),
+                'actual': _money(budgets['actual']),
+                'remaining': _money(budgets['remaining']),
+                'status': np.where(budgets['on_track'], '✅ On Track', '⚠️ Over')
+            }).values.tolist()
+            _add_table(elements, budget_rows, [1.5*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1*inch])
+        timer.mark('budgets')
         
         # Subscriptions Section
-        if report_data['subscriptions']:
+        subscriptions = report['subscriptions']
+        if not subscriptions.empty:
             elements.append(PageBreak())
-            elements.append(Paragraph("Active Subscriptions", summary_style))
+            elements.append(Paragraph("Active Subscriptions", HEADING_STYLE))
             
             sub_rows = [['Subscription', 'Amount (R)', 'Frequency', 'Next Due', 'Status']]
-            for sub in report_data['subscriptions']:
-                s_dict = dict(sub) if not isinstance(sub, dict) else sub
-                sub_rows.append([
-                    s_dict.get('category_name', ''),
-                    f"R{float(s_dict.get('amount', 0)):.2f}",
-                    s_dict.get('frequency', ''),
-                    s_dict.get('next_date', ''),
-                    s_dict.get('status', '')
-                ])
-            
-            sub_table = Table(sub_rows, colWidths=[1.5*inch, 1.2*inch, 1.2*inch, 1.2*inch, 0.8*inch])
-            sub_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E5090')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('FONTSIZE', (0, 1), (-1, -1), 9)
-            ]))
-            elements.append(sub_table)
+            sub_rows += pd.DataFrame({
+                'subscription': subscriptions['category_name'],
+                'amount': _money(subscriptions['amount']),
+                'frequency': subscriptions['frequency'],
+                'next_due': subscriptions['next_date'],
+                'status': subscriptions['status']
+            }).values.tolist()
+            _add_table(elements, sub_rows, [1.5*inch, 1.2*inch, 1.2*inch, 1.2*inch, 0.8*inch])
+        timer.mark('subscriptions')
         
         # Build PDF
         doc.build(elements)
         output.seek(0)
+        timer.mark('render')
+        timer.report(f"PDF {couple_id} {month_key(month, year)}")
         return output
     
     except Exception as e:
@@ -355,3 +409,315 @@ def export_to_pdf(couple_id, month, year):
         import traceback
         traceback.print_exc()
         return None
+
+
+def _month_label(key):
+    """'2026-03' -> 'Mar 2026'"""
+    return datetime.strptime(key, '%Y-%m').strftime('%b %Y')
+
+
+def build_range_report(couple_id, start, end, title=None):
+    """
+    Report over several months (quarter, year or any half-open range [start, end))
+    Scans the range's transactions once and buckets them by month for the trend tables.
+    Returns a dict: title, months, transactions, totals, monthly, category_trend, budgets, subscriptions
+    Raises ValueError when end isn't after start.
+    """
+    months = month_keys(start, end)
+    if not months:
+        raise ValueError('end must be after start')
+    transactions = _read_transactions(couple_id, *date_range_filter('t.transaction_date', start, end))
+    transactions['month'] = transactions['transaction_date'].str.slice(0, 7)
+    
+    # Income / expenses / net per month, months without activity included
+    monthly = (
+        transactions.pivot_table(index='month', columns='transaction_type', values='amount', aggfunc='sum', observed=False)
+        .reindex(index=months, columns=['Income', 'Expense'])
+        .fillna(0.0)
+    )
+    monthly.columns.name = None
+    monthly['Net'] = monthly['Income'] - monthly['Expense']
+    monthly['Transactions'] = transactions.groupby('month').size().reindex(months, fill_value=0)
+    
+    # Expense categories x months
+    expenses = transactions.loc[transactions['transaction_type'] == 'Expense']
+    category_trend = (
+        expenses.pivot_table(index='category_name', columns='month', values='amount', aggfunc='sum')
+        .reindex(columns=months)
+        .fillna(0.0)
+    )
+    category_trend['Total'] = category_trend.sum(axis=1)
+    category_trend = category_trend.sort_values('Total', ascending=False)
+    
+    # Every budget in the range against that month's actual spend
+    budgets = _read_frame("""
+        SELECT b.month_year AS month, b.category_id, COALESCE(c.category_name, '') AS category_name, b.planned_amount
+        FROM budgets b
+        LEFT JOIN categories c ON b.category_id = c.id
+        WHERE b.couple_id = ? AND b.month_year >= ? AND b.month_year <= ?
+        ORDER BY b.month_year, c.category_name
+        """,
+        (couple_id, months[0], months[-1]),
+        {'month': 'string', 'category_id': 'int64', 'category_name': 'string', 'planned_amount': 'float64'}
+    )
+    actual = expenses.groupby(['month', 'category_id'])['amount'].sum().rename('actual').reset_index()
+    budgets = budgets.merge(actual.astype({'month': 'string'}), on=['month', 'category_id'], how='left')
+    budgets['actual'] = budgets['actual'].fillna(0.0)
+    budgets['remaining'] = budgets['planned_amount'] - budgets['actual']
+    budgets['on_track'] = budgets['actual'] <= budgets['planned_amount']
+    
+    return {
+        'title': title or f"{_month_label(months[0])} - {_month_label(months[-1])}",
+        'months': months,
+        'transactions': transactions,
+        'totals': _totals(transactions),
+        'monthly': monthly,
+        'category_trend': category_trend,
+        'budgets': budgets,
+        'subscriptions': _read_subscriptions(couple_id)
+    }
+
+
+def export_range_to_excel(couple_id, start, end, title=None):
+    """Export a multi-month report: trend sheets plus one transactions sheet per month (ValueError for an empty range)"""
+    try:
+        report = build_range_report(couple_id, start, end, title)
+        transactions = report['transactions']
+        totals = report['totals']
+        
+        output = BytesIO()
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            pd.DataFrame({
+                'Report Period': [report['title']],
+                'Generated Date': [datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
+                'Total Transactions': [len(transactions)],
+                'Total Income (R)': [round(totals['income'], 2)],
+                'Total Expenses (R)': [round(totals['expenses'], 2)],
+                'Net (R)': [round(totals['net'], 2)]
+            }).to_excel(writer, sheet_name='Summary', index=False)
+            
+            monthly = report['monthly'].round(2)
+            monthly.index = [_month_label(key) for key in monthly.index]
+            monthly.rename(columns={'Income': 'Income (R)', 'Expense': 'Expenses (R)', 'Net': 'Net (R)'}).to_excel(
+                writer, sheet_name='Monthly Trend', index_label='Month'
+            )
+            
+            category_trend = report['category_trend'].round(2)
+            if not category_trend.empty:
+                category_trend.columns = [_month_label(key) if key != 'Total' else key for key in category_trend.columns]
+                category_trend.to_excel(writer, sheet_name='Category Trend', index_label='Category')
+            
+            budgets = report['budgets']
+            if not budgets.empty:
+                pd.DataFrame({
+                    'Month': budgets['month'].map(_month_label),
+                    'Category': budgets['category_name'],
+                    'Budgeted (R)': budgets['planned_amount'].round(2),
+                    'Actual (R)': budgets['actual'].round(2),
+                    'Remaining (R)': budgets['remaining'].round(2),
+                    'Status': np.where(budgets['on_track'], '✅ On Track', '⚠️ Over Budget')
+                }).to_excel(writer, sheet_name='Budget vs Actual', index=False)
+            
+            # One sheet per month, from the same frame
+            for key, month_rows in transactions.groupby('month', sort=True):
+                pd.DataFrame({
+                    'Date': month_rows['transaction_date'],
+                    'Category': month_rows['category_name'],
+                    'Description': month_rows['description'],
+                    'Amount (R)': month_rows['amount'].round(2),
+                    'Type': month_rows['transaction_type']
+                }).to_excel(writer, sheet_name=_month_label(key), index=False)
+        
+        output.seek(0)
+        return output
+    
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error exporting range to Excel: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+def export_range_to_pdf(couple_id, start, end, title=None, timings=None):
+    """
+    Export a multi-month report: trend tables, then one summary section per month
+    timings: optional dict filled with seconds spent per section
+    Raises ValueError for an empty range
+    """
+    try:
+        timer = _SectionTimer(timings)
+        report = build_range_report(couple_id, start, end, title)
+        transactions = report['transactions']
+        totals = report['totals']
+        timer.mark('query')
+        
+        output = BytesIO()
+        doc = SimpleDocTemplate(output, pagesize=A4)
+        elements = []
+        
+        def add_table(rows, col_widths=None):
+            _add_table(elements, rows, col_widths, TREND_TABLE_STYLE)
+        
+        elements.append(Paragraph(f"💰 Budget Report - {report['title']}", TITLE_STYLE))
+        elements.append(Paragraph("Summary", HEADING_STYLE))
+        add_table([
+            ['Metric', 'Amount (R)'],
+            ['Total Income', f"R{totals['income']:.2f}"],
+            ['Total Expenses', f"R{totals['expenses']:.2f}"],
+            ['Net', f"R{totals['net']:.2f}"],
+            ['Transactions', str(len(transactions))]
+        ], [3*inch, 2*inch])
+        
+        monthly = report['monthly']
+        elements.append(Paragraph("Monthly Trend", HEADING_STYLE))
+        add_table([['Month', 'Income (R)', 'Expenses (R)', 'Net (R)', 'Transactions']] + pd.DataFrame({
+            'month': [_month_label(key) for key in monthly.index],
+            'income': _money(monthly['Income']).values,
+            'expenses': _money(monthly['Expense']).values,
+            'net': _money(monthly['Net']).values,
+            'count': monthly['Transactions'].astype(str).values
+        }).values.tolist())
+        
+        # Category x month grid, split into blocks of 6 months to fit the page width
+        category_trend = report['category_trend']
+        if not category_trend.empty:
+            elements.append(Paragraph("Expenses by Category", HEADING_STYLE))
+            months = report['months']
+            for block in range(0, len(months), 6):
+                columns = months[block:block + 6] + (['Total'] if block + 6 >= len(months) else [])
+                grid = category_trend[columns].apply(lambda column: column.map('{:.2f}'.format))
+                add_table(
+                    [['Category'] + [_month_label(key) if key != 'Total' else key for key in columns]]
+                    + [[name] + values for name, values in zip(grid.index, grid.values.tolist())]
+                )
+        timer.mark('trends')
+        
+        # One section per month: totals, categories and budgets for that bucket
+        budgets = report['budgets']
+        for key in report['months']:
+            month_rows = transactions.loc[transactions['month'] == key]
+            if month_rows.empty:
+                continue
+            
+            elements.append(PageBreak())
+            elements.append(Paragraph(_month_label(key), HEADING_STYLE))
+            
+            month_totals = _totals(month_rows)
+            add_table([
+                ['Income (R)', 'Expenses (R)', 'Net (R)', 'Transactions'],
+                [f"R{month_totals['income']:.2f}", f"R{month_totals['expenses']:.2f}", f"R{month_totals['net']:.2f}", str(len(month_rows))]
+            ])
+            
+            by_category = (
+                month_rows.groupby(['category_name', 'transaction_type'], observed=True)['amount']
+                .agg(total='sum', count='count')
+                .reset_index()
+                .sort_values('total', ascending=False)
+            )
+            add_table([['Category', 'Type', 'Total (R)', 'Count']] + pd.DataFrame({
+                'category': by_category['category_name'],
+                'type': by_category['transaction_type'].astype('string'),
+                'total': _money(by_category['total']),
+                'count': by_category['count'].astype(str)
+            }).values.tolist())
+            
+            month_budgets = budgets.loc[budgets['month'] == key]
+            if not month_budgets.empty:
+                add_table([['Category', 'Budgeted (R)', 'Actual (R)', 'Remaining (R)', 'Status']] + pd.DataFrame({
+                    'category': month_budgets['category_name'],
+                    'budgeted': _money(month_budgets['planned_amount']),
+                    'actual': _money(month_budgets['actual']),
+                    'remaining': _money(month_budgets['remaining']),
+                    'status': np.where(month_budgets['on_track'], '✅ On Track', '⚠️ Over')
+                }).values.tolist())
+        
+        timer.mark('months')
+        
+        doc.build(elements)
+        output.seek(0)
+        timer.mark('render')
+        timer.report(f"Range PDF {couple_id} {report['title']}")
+        return output
+    
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Error exporting range to PDF: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+def iter_transactions_export(couple_id, start=None, end=None, file_format='csv', compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream a couple's transactions as CSV or NDJSON bytes (optionally gzip)
+    start/end: half-open date range, None for open-ended (both None = full history).
+    Rows are read chunk_size at a time from one cursor, so memory stays flat however long the history.
+    """
+    if file_format not in ('csv', 'ndjson'):
+        raise ValueError(f"Unknown export format '{file_format}'")
+    
+    date_clause, date_params = date_range_filter('t.transaction_date', start, end)
+    query = f"""
+    SELECT t.id, t.transaction_date, COALESCE(c.category_name, '') AS category_name,
+           COALESCE(t.description, '') AS description, t.amount, t.transaction_type, t.user_id
+    FROM transactions t
+    LEFT JOIN categories c ON t.category_id = c.id
+    WHERE t.couple_id = ? AND {date_clause}
+    ORDER BY t.transaction_date, t.id
+    """
+    # wbits=31 writes a gzip header/trailer
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    
+    def encode(text):
+        data = text.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if file_format == 'csv':
+        writer.writerow(EXPORT_COLUMNS)
+    
+    with pooled_connection() as conn:
+        cursor = conn.execute(query, (couple_id, *date_params))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            
+            if file_format == 'csv':
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+                    buffer.write('\n')
+            
+            chunk = encode(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+            if chunk:
+                yield chunk
+        cursor.close()
+    
+    tail = encode(buffer.getvalue())
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stream a couple's transactions to stdout")
+    parser.add_argument('command', choices=['export'])
+    parser.add_argument('couple_id', type=int)
+    parser.add_argument('--start', help="first date to include (YYYY-MM-DD)")
+    parser.add_argument('--end', help="first date to exclude (YYYY-MM-DD)")
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--gzip', action='store_true')
+    args = parser.parse_args()
+    
+    for chunk in iter_transactions_export(args.couple_id, args.start, args.end, args.format, args.gzip):
+        sys.stdout.buffer.write(chunk)
+    sys.stdout.buffer.flush()
@@ -0,0 +1,115 @@
+"""
+Monthly per-category totals kept in step with the transactions table
+Every write to transactions also updates monthly_category_totals inside the
+same transaction(), so dashboards read one row per category instead of
+scanning the month's transactions.
+Usage: python rollups.py rebuild|verify
+"""
+import sys
+from db_connection import execute_query, execute_many, fetch_all, transaction
+
+# Aggregate of the raw transactions in the same shape as monthly_category_totals
+_AGGREGATE_SQL = """
+SELECT couple_id, substr(transaction_date, 1, 7) AS month, category_id, transaction_type,
+       SUM(amount) AS total, COUNT(*) AS count
+FROM transactions
+{where}
+GROUP BY couple_id, month, category_id, transaction_type
+"""
+
+
+def month_of(trans_date):
+    """'YYYY-MM' for a date object or 'YYYY-MM-DD' string"""
+    return str(trans_date)[:7]
+
+
+def apply_transaction_delta(couple_id, trans_date, category_id, trans_type, amount, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) one transaction from the monthly totals
+    Call inside transaction() so the rollup commits together with the write.
+    """
+    key = (couple_id, month_of(trans_date), category_id, trans_type)
+    execute_query("""
+    INSERT INTO monthly_category_totals (couple_id, month, category_id, transaction_type, total, count)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (couple_id, month, category_id, transaction_type)
+    DO UPDATE SET total = total + excluded.total, count = count + excluded.count
+    """, (*key, sign * amount, sign))
+
+    if sign < 0:
+        execute_query("""
+        DELETE FROM monthly_category_totals
+        WHERE couple_id = ? AND month = ? AND category_id = ? AND transaction_type = ? AND count <= 0
+        """, key)
+
+
+def apply_transaction_deltas(rows, sign=1):
+    """
+    Batched apply_transaction_delta for many transactions at once
+    rows: (couple_id, trans_date, category_id, trans_type, amount) tuples
+    """
+    totals = {}
+    for couple_id, trans_date, category_id, trans_type, amount in rows:
+        key = (couple_id, month_of(trans_date), category_id, trans_type)
+        total, count = totals.get(key, (0, 0))
+        totals[key] = (total + sign * amount, count + sign)
+
+    execute_many("""
+    INSERT INTO monthly_category_totals (couple_id, month, category_id, transaction_type, total, count)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (couple_id, month, category_id, transaction_type)
+    DO UPDATE SET total = total + excluded.total, count = count + excluded.count
+    """, [(*key, total, count) for key, (total, count) in totals.items()])
+
+    if sign < 0:
+        execute_many("""
+        DELETE FROM monthly_category_totals
+        WHERE couple_id = ? AND month = ? AND category_id = ? AND transaction_type = ? AND count <= 0
+        """, list(totals))
+
+
+def delete_couple_totals(couple_id):
+    """Drop every rollup row of a couple (when all their transactions are deleted)"""
+    execute_query("DELETE FROM monthly_category_totals WHERE couple_id = ?", (couple_id,))
+
+
+def rebuild_monthly_totals(couple_id=None):
+    """Recompute the rollup from raw transactions (one couple, or everyone)"""
+    where, params = ("WHERE couple_id = ?", (couple_id,)) if couple_id else ("", ())
+
+    with transaction():
+        execute_query(f"DELETE FROM monthly_category_totals {where}", params)
+        execute_query(f"""
+        INSERT INTO monthly_category_totals (couple_id, month, category_id, transaction_type, total, count)
+        {_AGGREGATE_SQL.format(where=where)}
+        """, params)
+
+
+def verify_monthly_totals(couple_id=None):
+    """Compare the rollup with a fresh aggregate, returns the rows that differ"""
+    where, params = ("WHERE couple_id = ?", (couple_id,)) if couple_id else ("", ())
+    columns = "couple_id, month, category_id, transaction_type, ROUND(total, 2) AS total, count"
+    expected = f"SELECT {columns} FROM ({_AGGREGATE_SQL.format(where=where)})"
+    stored = f"SELECT {columns} FROM monthly_category_totals {where}"
+
+    missing = fetch_all(f"{expected} EXCEPT {stored}", params + params)
+    unexpected = fetch_all(f"{stored} EXCEPT {expected}", params + params)
+
+    return [('expected', dict(row)) for row in missing] + [('stored', dict(row)) for row in unexpected]
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'verify'
+
+    if command == 'rebuild':
+        rebuild_monthly_totals()
+        print("✓ Monthly totals rebuilt")
+    elif command == 'verify':
+        problems = verify_monthly_totals()
+        for source, row in problems:
+            print(f"❌ {source}: {row}")
+        print("✓ Monthly totals match transactions" if not problems else f"❌ {len(problems)} mismatched row(s) - run: python rollups.py rebuild")
+        sys.exit(1 if problems else 0)
+    else:
+        print("Usage: python rollups.py rebuild|verify")
+        sys.exit(1)
@@ -0,0 +1,128 @@
+"""
+Recurring postings scheduler
+Finds every couple with active recurring items due today (index on
+status, next_date), claims them in batches with a lease in recurring_leases so
+concurrent workers normally don't work on the same couple, and posts their
+missed occurrences through recurring.process_due_recurring_transactions.
+Leases only save work: if one expires mid-pass and two workers do get the
+same couple, the compare-and-set on next_date lets just one of them post
+each item's occurrences.
+Usage: python scheduler.py once|worker [--batch-size N] [--interval SECONDS]
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+from datetime import datetime, timedelta
+from config import SCHEDULER_BATCH_SIZE, SCHEDULER_INTERVAL, SCHEDULER_LEASE_SECONDS
+from db_connection import execute_many, execute_query, fetch_all, transaction
+from migrations import upgrade_database
+from recurring import process_due_recurring_transactions
+
+
+def worker_name():
+    """host:pid:thread - unique per running worker"""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def claim_due_couples(worker_id, today, after_couple_id=0, limit=SCHEDULER_BATCH_SIZE, lease_seconds=SCHEDULER_LEASE_SECONDS):
+    """
+    Lease the next batch of couples (by couple_id) with items due on or before today
+    Couples leased by another worker are skipped until the lease expires.
+    """
+    now = datetime.now()
+    with transaction():
+        query = """
+        SELECT DISTINCT r.couple_id
+        FROM recurring_transactions r
+        LEFT JOIN recurring_leases l ON l.couple_id = r.couple_id
+        WHERE r.status = 'Active' AND r.next_date <= ? AND r.couple_id > ?
+        AND (l.couple_id IS NULL OR l.expires_at < ?)
+        ORDER BY r.couple_id
+        LIMIT ?
+        """
+        couple_ids = [row['couple_id'] for row in fetch_all(query, (today, after_couple_id, now.isoformat(), limit))]
+
+        expires_at = (now + timedelta(seconds=lease_seconds)).isoformat()
+        execute_many("""
+        INSERT INTO recurring_leases (couple_id, worker_id, expires_at) VALUES (?, ?, ?)
+        ON CONFLICT (couple_id) DO UPDATE SET worker_id = excluded.worker_id, expires_at = excluded.expires_at
+        """, [(couple_id, worker_id, expires_at) for couple_id in couple_ids])
+
+    return couple_ids
+
+
+def release_couple(worker_id, couple_id):
+    """Drop our lease on a couple"""
+    execute_query("DELETE FROM recurring_leases WHERE couple_id = ? AND worker_id = ?", (couple_id, worker_id))
+
+
+def run_once(batch_size=SCHEDULER_BATCH_SIZE, today=None, worker_id=None):
+    """
+    One pass over every couple that is due
+    Returns metrics: couples, posted, batches, seconds, couples_per_sec, posted_per_sec
+    """
+    today = today or datetime.now().strftime('%Y-%m-%d')
+    worker_id = worker_id or worker_name()
+    started = time.perf_counter()
+    metrics = {'couples': 0, 'posted': 0, 'batches': 0}
+
+    # Walk couples in id order so one pass visits each couple at most once
+    last_couple_id = 0
+    while True:
+        couple_ids = claim_due_couples(worker_id, today, last_couple_id, batch_size)
+        if not couple_ids:
+            break
+
+        metrics['batches'] += 1
+        for couple_id in couple_ids:
+            try:
+                metrics['posted'] += process_due_recurring_transactions(couple_id, today)
+                metrics['couples'] += 1
+            finally:
+                release_couple(worker_id, couple_id)
+        last_couple_id = couple_ids[-1]
+
+    metrics['seconds'] = time.perf_counter() - started
+    metrics['couples_per_sec'] = metrics['couples'] / metrics['seconds'] if metrics['seconds'] else 0.0
+    metrics['posted_per_sec'] = metrics['posted'] / metrics['seconds'] if metrics['seconds'] else 0.0
+    return metrics
+
+
+def _print_metrics(metrics):
+    print(f"✓ {datetime.now():%Y-%m-%d %H:%M:%S} posted {metrics['posted']} transaction(s) for {metrics['couples']} couple(s) "
+          f"in {metrics['batches']} batch(es), {metrics['seconds']:.2f}s "
+          f"({metrics['couples_per_sec']:.0f} couples/s, {metrics['posted_per_sec']:.0f} postings/s)")
+
+
+def run_worker(interval=SCHEDULER_INTERVAL, batch_size=SCHEDULER_BATCH_SIZE):
+    """Run a pass every interval seconds until interrupted (a failed pass is logged and retried)"""
+    worker_id = worker_name()
+    print(f"🕒 Scheduler worker {worker_id} running every {interval}s")
+    while True:
+        try:
+            _print_metrics(run_once(batch_size, worker_id=worker_id))
+        except Exception as e:
+            # e.g. "database is locked" past the busy timeout during an import or migration: retry next pass
+            print(f"❌ {datetime.now():%Y-%m-%d %H:%M:%S} scheduler pass failed: {e}")
+        time.sleep(interval)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Post due recurring transactions for all couples")
+    parser.add_argument('command', choices=['once', 'worker'])
+    parser.add_argument('--batch-size', type=int, default=SCHEDULER_BATCH_SIZE)
+    parser.add_argument('--interval', type=int, default=SCHEDULER_INTERVAL)
+    args = parser.parse_args()
+
+    upgrade_database()
+    try:
+        if args.command == 'once':
+            _print_metrics(run_once(args.batch_size))
+        else:
+            run_worker(args.interval, args.batch_size)
+    except KeyboardInterrupt:
+        print("Scheduler stopped")
+        sys.exit(0)
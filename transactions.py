@@ -1,7 +1,26 @@
-from db_connection import execute_query, fetch_all, fetch_one
+import hashlib
+import sqlite3
+from db_connection import execute_query, execute_many, fetch_all, fetch_one, transaction
+from periods import month_key
+from rollups import apply_transaction_delta, apply_transaction_deltas
+from categories import get_category_id
+from query_cache import cached_query, invalidate_queries
+from recurring import get_upcoming_subscriptions
 from datetime import datetime
 
 
+def transaction_fingerprint(couple_id, category_id, amount, trans_date, description, trans_type, source_id=None):
+    """
+    Hash identifying a transaction for duplicate detection (stored in the UNIQUE fingerprint column)
+    A missing description counts as empty, so NULL descriptions are deduplicated too.
+    source_id (e.g. a bank's FITID) tells apart rows that are otherwise identical.
+    """
+    key = f"{couple_id}|{category_id}|{float(amount):.2f}|{str(trans_date)[:10]}|{description or ''}|{trans_type}"
+    if source_id:
+        key += f"|{source_id}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
 def save_transaction(user_id, couple_id, amount, category, description, trans_date, trans_type):
     """Save a transaction to database"""
     try:
@@ -9,48 +28,81 @@ def save_transaction(user_id, couple_id, amount, category, description, trans_da
         if amount <= 0:
             return False, "❌ Amount must be greater than 0"
 
-        # Check if category exists
-        query = "SELECT id FROM categories WHERE couple_id = ? AND category_name = ?"
-        category_result = fetch_one(query, (couple_id, category))
-        
-        if category_result:
-            category_id = category_result['id']
-        else:
-            # Create new category
+        with transaction():
+            # Get or create category (cached per couple)
             category_type = 'expense' if trans_type == 'Expense' else 'income'
-            query = "INSERT INTO categories (couple_id, category_name, category_type) VALUES (?, ?, ?)"
-            execute_query(query, (couple_id, category, category_type))
+            category_id = get_category_id(couple_id, category, create_type=category_type)
             
-            # Get the newly created category id
-            query = "SELECT id FROM categories WHERE couple_id = ? AND category_name = ?"
-            category_result = fetch_one(query, (couple_id, category))
-            category_id = category_result['id']
-        
-        # 🛡️ VALIDATION 2: Check for Duplicates
-        # Prevents adding the exact same transaction twice (Same amount, date, category, description)
-        check_query = """
-        SELECT id FROM transactions 
-        WHERE couple_id = ? 
-        AND category_id = ? 
-        AND amount = ? 
-        AND transaction_date = ? 
-        AND description = ?
-        AND transaction_type = ?
-        """
-        duplicate = fetch_one(check_query, (couple_id, category_id, amount, trans_date, description, trans_type))
-        
-        if duplicate:
-            return False, "⚠️ Duplicate detected! This transaction already exists."
+            # 🛡️ VALIDATION 2: Check for Duplicates
+            # Prevents adding the exact same transaction twice (Same amount, date, category, description)
+            # The UNIQUE fingerprint index rejects it as part of the insert itself
+            fingerprint = transaction_fingerprint(couple_id, category_id, amount, trans_date, description, trans_type)
+            query = """
+            INSERT INTO transactions (couple_id, user_id, category_id, amount, description, transaction_date, transaction_type, fingerprint)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (fingerprint) DO NOTHING
+            """
+            cursor = execute_query(query, (couple_id, user_id, category_id, amount, description, trans_date, trans_type, fingerprint))
+            
+            if cursor.rowcount == 0:
+                return False, "⚠️ Duplicate detected! This transaction already exists."
 
-        # Save the transaction
-        query = "INSERT INTO transactions (couple_id, user_id, category_id, amount, description, transaction_date, transaction_type) VALUES (?, ?, ?, ?, ?, ?, ?)"
-        execute_query(query, (couple_id, user_id, category_id, amount, description, trans_date, trans_type))
-        return True, "✅ Transaction saved!"
+            apply_transaction_delta(couple_id, trans_date, category_id, trans_type, amount)
+            invalidate_queries(couple_id)
+            return True, "✅ Transaction saved!"
         
     except Exception as e:
         return False, f"❌ Error: {str(e)}"
 
 
+def save_transactions_bulk(user_id, couple_id, rows):
+    """
+    Save many transactions in ONE commit (bank imports, recurring postings)
+    rows: (amount, category, description, trans_date, trans_type[, source_id]) tuples with positive
+    amounts and 'YYYY-MM-DD' dates. Returns (saved_count, duplicate_count)
+    """
+    if not rows:
+        return 0, 0
+    
+    with transaction():
+        # Resolve every category of the batch once (cached per couple)
+        categories = {}
+        for _, category, _, _, trans_type, *_ in rows:
+            if category not in categories:
+                category_type = 'expense' if trans_type == 'Expense' else 'income'
+                categories[category] = get_category_id(couple_id, category, create_type=category_type)
+        
+        fingerprints = [
+            transaction_fingerprint(couple_id, categories[category], amount, trans_date, description, trans_type, *source)
+            for amount, category, description, trans_date, trans_type, *source in rows
+        ]
+        
+        # 🛡️ Duplicate check: one indexed lookup per chunk of fingerprints (we hold the write lock, so it stays true)
+        seen = set()
+        for start in range(0, len(fingerprints), 500):
+            chunk = fingerprints[start:start + 500]
+            query = f"SELECT fingerprint FROM transactions WHERE fingerprint IN ({', '.join('?' * len(chunk))})"
+            seen.update(row['fingerprint'] for row in fetch_all(query, chunk))
+        
+        new_rows = []
+        for (amount, category, description, trans_date, trans_type, *_), fingerprint in zip(rows, fingerprints):
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            new_rows.append((couple_id, user_id, categories[category], amount, description, str(trans_date), trans_type, fingerprint))
+        
+        query = """
+        INSERT INTO transactions (couple_id, user_id, category_id, amount, description, transaction_date, transaction_type, fingerprint)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (fingerprint) DO NOTHING
+        """
+        execute_many(query, new_rows)
+        apply_transaction_deltas([(couple_id, row[5], row[2], row[6], row[3]) for row in new_rows])
+        invalidate_queries(couple_id)
+    
+    return len(new_rows), len(rows) - len(new_rows)
+
+
 def get_user_transactions(couple_id, user_id=None):
     """Get transactions for a user or couple"""
     try:
@@ -80,6 +132,54 @@ def get_user_transactions(couple_id, user_id=None):
         return []
 
 
+def get_user_transactions_page(couple_id, user_id=None, after=None, limit=50):
+    """
+    One page of transactions, newest first (keyset pagination)
+    after: (transaction_date, id) of the last row on the previous page, None for the first page
+    Returns (rows, next_cursor) - next_cursor is None on the last page
+    """
+    try:
+        conditions = ["t.couple_id = ?"]
+        params = [couple_id]
+        
+        if user_id:
+            conditions.append("t.user_id = ?")
+            params.append(user_id)
+        
+        if after:
+            # Row-value comparison seeks straight to the cursor in the (couple, [user,] date) index
+            conditions.append("(t.transaction_date, t.id) < (?, ?)")
+            params.extend([str(after[0]), after[1]])
+        
+        query = f"""
+        SELECT t.id, t.amount, t.description, t.transaction_date, t.transaction_type, c.category_name, t.user_id
+        FROM transactions t
+        JOIN categories c ON t.category_id = c.id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY t.transaction_date DESC, t.id DESC
+        LIMIT ?
+        """
+        # One extra row tells us whether another page exists
+        rows = fetch_all(query, (*params, limit + 1))
+        
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, (rows[-1]['transaction_date'], rows[-1]['id'])
+        return rows, None
+    except Exception as e:
+        print(f"Error fetching transactions: {str(e)}")
+        return [], None
+
+
+def count_user_transactions(couple_id, user_id=None):
+    """Number of transactions for a user or couple"""
+    if user_id:
+        result = fetch_one("SELECT COUNT(*) as count FROM transactions WHERE couple_id = ? AND user_id = ?", (couple_id, user_id))
+    else:
+        result = fetch_one("SELECT COUNT(*) as count FROM transactions WHERE couple_id = ?", (couple_id,))
+    return result['count'] if result else 0
+
+
 def edit_transaction(user_id, transaction_id, amount, category, description, trans_date, trans_type, couple_id):
     """Edit an existing transaction - USER CAN ONLY EDIT THEIR OWN"""
     try:
@@ -87,42 +187,39 @@ def edit_transaction(user_id, transaction_id, amount, category, description, tra
         if amount <= 0:
             return False, "❌ Amount must be greater than 0"
 
-        # SECURITY: Check if this transaction belongs to the user
-        query = "SELECT user_id, couple_id FROM transactions WHERE id = ?"
-        trans = fetch_one(query, (transaction_id,))
-        
-        if not trans:
-            return False, "❌ Transaction not found"
-        
-        if trans['user_id'] != user_id:
-            return False, "❌ You can only edit your own transactions"
-        
-        # Get or create category
-        query = "SELECT id FROM categories WHERE couple_id = ? AND category_name = ?"
-        category_result = fetch_one(query, (couple_id, category))
-        
-        if category_result:
-            category_id = category_result['id']
-        else:
-            # Create new category
+        with transaction():
+            # SECURITY: Check if this transaction belongs to the user
+            query = "SELECT user_id, couple_id, category_id, amount, transaction_date, transaction_type FROM transactions WHERE id = ?"
+            trans = fetch_one(query, (transaction_id,))
+            
+            if not trans:
+                return False, "❌ Transaction not found"
+            
+            if trans['user_id'] != user_id:
+                return False, "❌ You can only edit your own transactions"
+            
+            # Get or create category (cached per couple)
             category_type = 'expense' if trans_type == 'Expense' else 'income'
-            query = "INSERT INTO categories (couple_id, category_name, category_type) VALUES (?, ?, ?)"
-            execute_query(query, (couple_id, category, category_type))
+            category_id = get_category_id(couple_id, category, create_type=category_type)
             
-            # Get the newly created category id
-            query = "SELECT id FROM categories WHERE couple_id = ? AND category_name = ?"
-            category_result = fetch_one(query, (couple_id, category))
-            category_id = category_result['id']
-        
-        # Update the transaction
-        query = """
-        UPDATE transactions 
-        SET category_id = ?, amount = ?, description = ?, transaction_date = ?, transaction_type = ?
-        WHERE id = ? AND user_id = ?
-        """
-        execute_query(query, (category_id, amount, description, trans_date, trans_type, transaction_id, user_id))
-        
-        return True, "✅ Transaction updated!"
+            # Update the transaction
+            fingerprint = transaction_fingerprint(trans['couple_id'], category_id, amount, trans_date, description, trans_type)
+            query = """
+            UPDATE transactions 
+            SET category_id = ?, amount = ?, description = ?, transaction_date = ?, transaction_type = ?, fingerprint = ?
+            WHERE id = ? AND user_id = ?
+            """
+            try:
+                execute_query(query, (category_id, amount, description, trans_date, trans_type, fingerprint, transaction_id, user_id))
+            except sqlite3.IntegrityError:
+                return False, "⚠️ Duplicate detected! This transaction already exists."
+            
+            # Move the amount between monthly totals
+            apply_transaction_delta(trans['couple_id'], trans['transaction_date'], trans['category_id'], trans['transaction_type'], trans['amount'], sign=-1)
+            apply_transaction_delta(trans['couple_id'], trans_date, category_id, trans_type, amount)
+            invalidate_queries(trans['couple_id'])
+            
+            return True, "✅ Transaction updated!"
         
     except Exception as e:
         return False, f"❌ Error: {str(e)}"
@@ -131,26 +228,30 @@ def edit_transaction(user_id, transaction_id, amount, category, description, tra
 def delete_transaction_user(user_id, transaction_id):
     """Delete a transaction - USER CAN ONLY DELETE THEIR OWN"""
     try:
-        # SECURITY: Check if this transaction belongs to the user
-        query = "SELECT user_id FROM transactions WHERE id = ?"
-        trans = fetch_one(query, (transaction_id,))
-        
-        if not trans:
-            return False, "❌ Transaction not found"
-        
-        if trans['user_id'] != user_id:
-            return False, "❌ You can only delete your own transactions"
-        
-        # Delete the transaction
-        query = "DELETE FROM transactions WHERE id = ? AND user_id = ?"
-        execute_query(query, (transaction_id, user_id))
-        
-        return True, "✅ Transaction deleted!"
+        with transaction():
+            # SECURITY: Check if this transaction belongs to the user
+            query = "SELECT user_id, couple_id, category_id, amount, transaction_date, transaction_type FROM transactions WHERE id = ?"
+            trans = fetch_one(query, (transaction_id,))
+            
+            if not trans:
+                return False, "❌ Transaction not found"
+            
+            if trans['user_id'] != user_id:
+                return False, "❌ You can only delete your own transactions"
+            
+            # Delete the transaction
+            query = "DELETE FROM transactions WHERE id = ? AND user_id = ?"
+            execute_query(query, (transaction_id, user_id))
+            apply_transaction_delta(trans['couple_id'], trans['transaction_date'], trans['category_id'], trans['transaction_type'], trans['amount'], sign=-1)
+            invalidate_queries(trans['couple_id'])
+            
+            return True, "✅ Transaction deleted!"
         
     except Exception as e:
         return False, f"❌ Error: {str(e)}"
 
 
+@cached_query
 def get_category_summary(couple_id, month=None, year=None):
     """Get spending summary by category"""
     try:
@@ -159,22 +260,22 @@ def get_category_summary(couple_id, month=None, year=None):
             month = now.month
             year = now.year
         
+        # Read the maintained monthly rollup instead of scanning transactions
         query = """
-        SELECT c.category_name, t.transaction_type, SUM(t.amount) as total
-        FROM transactions t
-        JOIN categories c ON t.category_id = c.id
-        WHERE t.couple_id = ? 
-        AND strftime('%m', t.transaction_date) = ? 
-        AND strftime('%Y', t.transaction_date) = ?
-        GROUP BY c.category_name, t.transaction_type
+        SELECT c.category_name, m.transaction_type, SUM(m.total) as total
+        FROM monthly_category_totals m
+        JOIN categories c ON m.category_id = c.id
+        WHERE m.couple_id = ? AND m.month = ?
+        GROUP BY c.category_name, m.transaction_type
         """
-        results = fetch_all(query, (couple_id, f"{month:02d}", f"{year}"))
+        results = fetch_all(query, (couple_id, month_key(month, year)))
         return results
     except Exception as e:
         print(f"Error fetching summary: {str(e)}")
         return []
 
 
+@cached_query
 def get_monthly_total(couple_id, month=None, year=None):
     """Get total income and expenses for the month"""
     try:
@@ -183,21 +284,82 @@ def get_monthly_total(couple_id, month=None, year=None):
             month = now.month
             year = now.year
         
+        # Read the maintained monthly rollup instead of scanning transactions
         query = """
-        SELECT transaction_type, SUM(amount) as total
-        FROM transactions
-        WHERE couple_id = ? 
-        AND strftime('%m', transaction_date) = ? 
-        AND strftime('%Y', transaction_date) = ?
+        SELECT transaction_type, SUM(total) as total
+        FROM monthly_category_totals
+        WHERE couple_id = ? AND month = ?
         GROUP BY transaction_type
         """
-        results = fetch_all(query, (couple_id, f"{month:02d}", f"{year}"))
+        results = fetch_all(query, (couple_id, month_key(month, year)))
         return results
     except Exception as e:
         print(f"Error fetching monthly total: {str(e)}")
         return []
 
 
+@cached_query
+def get_dashboard_snapshot(couple_id, month=None, year=None, days_ahead=30):
+    """
+    Everything the Dashboard shows for a month from one grouped query over the rollup
+    Returns {'income', 'expenses', 'net', 'categories', 'budgets', 'upcoming'}
+    """
+    if not month or not year:
+        now = datetime.now()
+        month = now.month
+        year = now.year
+    
+    snapshot = {'income': 0, 'expenses': 0, 'net': 0, 'categories': [], 'budgets': [], 'upcoming': []}
+    
+    try:
+        month_year = month_key(month, year)
+        
+        # One row per (category, type) with activity this month, plus budgeted categories without any
+        query = """
+        SELECT c.category_name, m.transaction_type, m.total, b.planned_amount
+        FROM categories c
+        LEFT JOIN monthly_category_totals m ON m.category_id = c.id AND m.couple_id = ? AND m.month = ?
+        LEFT JOIN budgets b ON b.category_id = c.id AND b.couple_id = ? AND b.month_year = ?
+        WHERE c.couple_id = ? AND (m.category_id IS NOT NULL OR b.id IS NOT NULL)
+        ORDER BY c.category_name
+        """
+        rows = fetch_all(query, (couple_id, month_year, couple_id, month_year, couple_id))
+        
+        budgets = {}
+        for row in rows:
+            if row['transaction_type']:
+                snapshot['categories'].append({
+                    'category_name': row['category_name'],
+                    'transaction_type': row['transaction_type'],
+                    'total': row['total']
+                })
+                if row['transaction_type'] == 'Income':
+                    snapshot['income'] += row['total']
+                else:
+                    snapshot['expenses'] += row['total']
+            
+            if row['planned_amount'] is not None:
+                budget = budgets.setdefault(row['category_name'], {
+                    'category_name': row['category_name'],
+                    'budgeted': row['planned_amount'],
+                    'actual': 0
+                })
+                if row['transaction_type'] == 'Expense':
+                    budget['actual'] += row['total']
+        
+        for budget in budgets.values():
+            budget['remaining'] = budget['budgeted'] - budget['actual']
+            budget['percent'] = budget['actual'] / budget['budgeted'] * 100 if budget['budgeted'] else 0
+            snapshot['budgets'].append(budget)
+        
+        snapshot['net'] = snapshot['income'] - snapshot['expenses']
+        snapshot['upcoming'] = get_upcoming_subscriptions(couple_id, days_ahead)
+    except Exception as e:
+        print(f"Error fetching dashboard: {str(e)}")
+    
+    return snapshot
+
+
 def save_budget(couple_id, category_name, planned_amount, month, year):
     """Save or update a budget for a category"""
     try:
@@ -206,28 +368,20 @@ def save_budget(couple_id, category_name, planned_amount, month, year):
             return False, "❌ Budget amount cannot be negative"
 
         # Get category id
-        query = "SELECT id FROM categories WHERE couple_id = ? AND category_name = ?"
-        cat = fetch_one(query, (couple_id, category_name))
+        category_id = get_category_id(couple_id, category_name)
         
-        if not cat:
+        if not category_id:
             return False, f"Category {category_name} not found"
 
-
-        category_id = cat['id']
-        month_year = f"{year}-{month:02d}"
-        
-        # Check if budget already exists
-        query = "SELECT id FROM budgets WHERE couple_id = ? AND category_id = ? AND month_year = ?"
-        existing = fetch_one(query, (couple_id, category_id, month_year))
+        month_year = month_key(month, year)
         
-        if existing:
-            # Update existing budget
-            query = "UPDATE budgets SET planned_amount = ? WHERE couple_id = ? AND category_id = ? AND month_year = ?"
-            execute_query(query, (planned_amount, couple_id, category_id, month_year))
-        else:
-            # Create new budget
-            query = "INSERT INTO budgets (couple_id, category_id, planned_amount, month_year) VALUES (?, ?, ?, ?)"
-            execute_query(query, (couple_id, category_id, planned_amount, month_year))
+        # Create the budget, or update it if this month already has one (UNIQUE couple/month/category)
+        query = """
+        INSERT INTO budgets (couple_id, category_id, planned_amount, month_year) VALUES (?, ?, ?, ?)
+        ON CONFLICT (couple_id, month_year, category_id) DO UPDATE SET planned_amount = excluded.planned_amount
+        """
+        execute_query(query, (couple_id, category_id, planned_amount, month_year))
+        invalidate_queries(couple_id)
         
         return True, "✅ Budget saved!"
         
@@ -258,6 +412,7 @@ def get_budgets(couple_id, month=None, year=None):
         return []
 
 
+@cached_query
 def get_budget_vs_actual(couple_id, month=None, year=None):
     """Get budget vs actual spending by category"""
     try:
@@ -266,24 +421,22 @@ def get_budget_vs_actual(couple_id, month=None, year=None):
             month = now.month
             year = now.year
         
-        month_year = f"{year}-{month:02d}"
+        month_year = month_key(month, year)
         
+        # Actual spend comes from the monthly rollup (one row per category) instead of the month's transactions
         query = """
         SELECT 
             c.category_name,
             COALESCE(b.planned_amount, 0) as budgeted,
-            COALESCE(SUM(t.amount), 0) as actual
+            COALESCE(m.total, 0) as actual
         FROM categories c
         LEFT JOIN budgets b ON c.id = b.category_id AND b.month_year = ? AND b.couple_id = ?
-        LEFT JOIN transactions t ON c.id = t.category_id 
-            AND t.transaction_type = 'Expense'
-            AND strftime('%m', t.transaction_date) = ?
-            AND strftime('%Y', t.transaction_date) = ?
-            AND t.couple_id = ?
+        LEFT JOIN monthly_category_totals m ON m.category_id = c.id
+            AND m.couple_id = ? AND m.month = ? AND m.transaction_type = 'Expense'
         WHERE c.couple_id = ? AND c.category_type = 'expense'
-        GROUP BY c.category_name
+        ORDER BY c.category_name
         """
-        results = fetch_all(query, (month_year, couple_id, f"{month:02d}", f"{year}", couple_id, couple_id))
+        results = fetch_all(query, (month_year, couple_id, couple_id, month_year, couple_id))
         return results
     except Exception as e:
         print(f"Error: {str(e)}")